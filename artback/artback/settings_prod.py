@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'production',
     'reports',
     'payroll',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -91,6 +92,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Job workers and web workers write concurrently: take the write lock when a
+        # transaction starts so writers queue on the timeout instead of failing with "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than the in-memory default, so tests that write from several
+        # threads wait on SQLite's lock like the real database does
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory: each gunicorn worker keeps its own copy, so entries changed
+# through another worker can be served until they expire
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'artback',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
     }
 }
 
@@ -145,6 +169,23 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Payroll
+# Days of the month on which a new pay period starts, e.g. [1, 15] for split pay.
+# Monthly periods ([1]) are calculated from the earnings ledger on their first run.
+PAYROLL_PERIOD_START_DAYS = [1]
+
+# Orders
+# Dropped from phone numbers typed into customer search, so +254 712 and 0712 find the same customers
+CUSTOMER_PHONE_COUNTRY_CODE = '254'
+
+# Inventory
+# Seconds cached SKU lookups and valuation reports are served before they are re-read from the database
+ITEM_CACHE_TIMEOUT = 60
+
+# Reports
+# Seconds between the job worker's incremental refreshes of the materialized reports
+REPORT_REFRESH_SECONDS = 300
+
 # JWT settings
 from datetime import timedelta
 
@@ -16,6 +16,7 @@ urlpatterns = [
     path('api/', include('production.urls')),
     path('api/', include('reports.urls')),
     path('api/', include('payroll.urls')),
+    path('api/', include('jobs.urls')),
 ]
 
 # Add static and media URL patterns
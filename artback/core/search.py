@@ -0,0 +1,62 @@
+# core/search.py
+import re
+
+from django.db import models
+
+
+class SearchDocumentField(models.TextField):
+    """
+    The hidden column an SQLite FTS5 table shares its name with. Filtering it
+    with __match runs a full-text query over every column of the table.
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def fts_enabled(connection):
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(text):
+    """Turn typed text into an FTS5 query where every word must match as a prefix."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+def table_exists(connection, table):
+    return table in connection.introspection.table_names()
+
+
+def drop_triggers(connection, triggers):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in triggers:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def install_triggers(connection, table, triggers, refill_sql):
+    """
+    (Re)create the triggers {name: sql} that keep the FTS5 `table` current and
+    refill it with `refill_sql`; does nothing until the table exists or while
+    all the triggers are in place.
+    """
+    if connection.vendor != 'sqlite' or not table_exists(connection, table):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing >= triggers.keys():
+            return
+        for name, sql in triggers.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(sql)
+        for sql in refill_sql:
+            cursor.execute(sql)
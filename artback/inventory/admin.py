@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Item, InventoryActivity, Category
+from .models import Item, InventoryActivity, Category, StockSnapshot, StockAlert
 
 # Register your models here.
 admin.site.register(Item)
 admin.site.register(InventoryActivity)
 admin.site.register(Category)
+admin.site.register(StockSnapshot)
+admin.site.register(StockAlert)
\ No newline at end of file
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate, post_migrate
+
+from . import search
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        pre_migrate.connect(drop_search_triggers, sender=self)
+        post_migrate.connect(install_search_triggers, sender=self)
+
+
+def drop_search_triggers(sender, using, plan=None, **kwargs):
+    if plan:
+        search.drop_search_triggers(connections[using])
+
+
+def install_search_triggers(sender, using, **kwargs):
+    search.install_search_triggers(connections[using])
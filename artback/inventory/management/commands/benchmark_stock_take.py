@@ -0,0 +1,51 @@
+# inventory/management/commands/benchmark_stock_take.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from inventory.models import Category, Item
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Time POST /api/items/batch_update_stock/ for stock-takes of increasing size. '
+            'All data is created inside a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[10, 500, 5_000],
+                            help='Stock-take line counts to benchmark')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'lines':>8} {'status':>7} {'queries':>8} {'seconds':>9}")
+        for lines in options['lines']:
+            try:
+                with transaction.atomic():
+                    result = self._run(lines)
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(f"{lines:>8} {result['status']:>7} {result['queries']:>8} {result['seconds']:>9.3f}")
+
+    def _run(self, lines):
+        category = Category.objects.create(name='__benchmark__')
+        items = Item.objects.bulk_create(
+            Item(name=f'Item {i}', category=category, sku=f'~{i:08d}', stock=i % 40, selling_price=0)
+            for i in range(lines)
+        )
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser('__benchmark__', password=None))
+        payload = {'items': [{str(item.id): item.stock + 1 + i % 3} for i, item in enumerate(items)]}
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.post('/api/items/batch_update_stock/', payload, format='json', secure=True)
+            seconds = time.perf_counter() - started
+
+        return {'status': response.status_code, 'queries': len(queries), 'seconds': seconds}
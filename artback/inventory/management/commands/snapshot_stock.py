@@ -0,0 +1,48 @@
+# inventory/management/commands/snapshot_stock.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from inventory import services
+from inventory.models import StockSnapshot
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}". Use YYYY-MM-DD.')
+
+
+class Command(BaseCommand):
+    help = ('Take stock snapshots every --every days after the latest one, up to --until. '
+            'The first run starts at --from and works out that day from the live stock and the activity ledger.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_date',
+                            help='Date of the first snapshot when none exist yet (YYYY-MM-DD, default --until)')
+        parser.add_argument('--until', help='Last day to snapshot (YYYY-MM-DD, default yesterday)')
+        parser.add_argument('--every', type=int, default=7, help='Days between snapshots')
+
+    def handle(self, *args, **options):
+        until = parse_date(options['until']) if options['until'] else timezone.localdate() - timedelta(days=1)
+        if options['every'] < 1:
+            raise CommandError('--every must be at least 1.')
+        step = timedelta(days=options['every'])
+
+        latest = StockSnapshot.objects.aggregate(date=Max('date'))['date']
+        if latest is not None:
+            day = latest + step
+        else:
+            day = parse_date(options['first_date']) if options['first_date'] else until
+
+        taken = 0
+        while day <= until:
+            rows = services.take_snapshot(day)
+            self.stdout.write(f'{day}: {rows} items with stock')
+            taken += 1
+            day += step
+
+        self.stdout.write(self.style.SUCCESS(f'{taken} snapshots taken; latest is {day - step if taken else latest}.'))
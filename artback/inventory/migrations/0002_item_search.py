@@ -0,0 +1,53 @@
+# Generated by Django 5.1 on 2026-10-17 19:39
+
+import core.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from inventory.search import drop_search_triggers
+
+# The index only exists on SQLite. The triggers that keep it current are managed
+# outside migrations, in inventory/search.py, and installed after migrate
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE inventory_itemsearch USING fts5(name, category, sku, prefix='1 2 3')""",
+    # Rank by bm25 with name and SKU hits weighted above category hits
+    """INSERT INTO inventory_itemsearch(inventory_itemsearch, rank) VALUES ('rank', 'bm25(10.0, 2.0, 5.0)')""",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_triggers(schema_editor.connection)
+        schema_editor.execute("DROP TABLE IF EXISTS inventory_itemsearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemSearch',
+            fields=[
+                ('item', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='inventory.item')),
+                ('name', models.TextField()),
+                ('category', models.TextField()),
+                ('sku', models.TextField()),
+                ('document', core.search.SearchDocumentField(db_column='inventory_itemsearch')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'inventory_itemsearch',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_item_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='sku',
+            field=models.CharField(blank=True, max_length=16, null=True, unique=True),
+        ),
+    ]
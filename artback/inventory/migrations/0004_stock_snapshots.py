@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_widen_item_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('stock', models.IntegerField()),
+            ],
+            options={
+                'ordering': ['-date', 'item'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventoryactivity',
+            index=models.Index(fields=['item', 'timestamp'], name='inventory_i_item_id_0691e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryactivity',
+            index=models.Index(fields=['timestamp'], name='inventory_i_timesta_781ef0_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.item'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stocksnapshot',
+            unique_together={('item', 'date')},
+        ),
+    ]
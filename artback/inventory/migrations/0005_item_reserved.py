@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1 on 2026-10-17 19:52
+
+import django.db.models.deletion
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_item_reserved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('LOW', 'Below reorder level'), ('RESTOCKED', 'Back at reorder level')], max_length=10)),
+                ('available', models.IntegerField()),
+                ('reorder_level', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=50),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('stock__lt', django.db.models.expressions.CombinedExpression(models.F('reserved'), '+', models.F('reorder_level')))), fields=['name'], name='inventory_item_below_reorder'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to='inventory.item'),
+        ),
+    ]
@@ -1,5 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast, Concat, LPad
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.search import SearchDocumentField
+
+# Items whose available stock (stock - reserved) is under their reorder level;
+# queries must use this exact condition for SQLite to pick the partial index
+BELOW_REORDER_LEVEL = Q(stock__lt=F('reserved') + F('reorder_level'))
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -11,7 +22,9 @@ class Item(models.Model):
     name = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='items')
     stock = models.PositiveIntegerField(default=0)
-    sku = models.CharField(max_length=9, null=True, blank=True, unique=True)
+    reserved = models.PositiveIntegerField(default=0)  # Units held for open orders; see services.reserve_stock
+    sku = models.CharField(max_length=16, null=True, blank=True, unique=True)
+    reorder_level = models.PositiveIntegerField(default=50)  # Alert when available stock drops below this
     
     # Production costs
     splitting_drawing_cost = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)], default=0)
@@ -24,22 +37,57 @@ class Item(models.Model):
     # Selling price
     selling_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=BELOW_REORDER_LEVEL, name='inventory_item_below_reorder'),
+        ]
+
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.sku:
-            super().save(*args, **kwargs)  # Save first to get an ID
-            self.sku = self.generate_sku()
-            super().save(update_fields=['sku'])  # Save again with the SKU
-        else:
+        creating = self._state.adding
+        with transaction.atomic():
             super().save(*args, **kwargs)
+            if not self.sku:
+                # The SKU embeds the new id; set it with a plain UPDATE rather than a second full save
+                self.sku = self.build_sku(self.category, self.id)
+                Item.objects.filter(pk=self.pk).update(sku=self.sku)
+            if creating and self.stock:
+                # Log the opening stock, however the item was created, so the activity ledger
+                # accounts for all of it and stock_as_of shows none before the item existed.
+                # bulk_create skips save(); services.import_items logs its own.
+                InventoryActivity.objects.create(item=self, activity_type='ADD', quantity=self.stock)
+
+    @staticmethod
+    def sku_prefix(category):
+        return f"{category.name[:3].upper()}{category.id:02d}"
+
+    @classmethod
+    def build_sku(cls, category, item_id):
+        return f"{cls.sku_prefix(category)}{item_id:03d}"
+
+    @classmethod
+    def sku_expression(cls, category):
+        """build_sku as an SQL expression over the row's id, for assigning many SKUs in one UPDATE."""
+        item_id = Cast('id', models.CharField())
+        return Concat(
+            Value(cls.sku_prefix(category)),
+            Case(When(id__lt=1000, then=LPad(item_id, 3, Value('0'))), default=item_id),
+            output_field=models.CharField(),
+        )
+
+    @staticmethod
+    def cache_key(sku):
+        return f'inventory:item:sku:{sku}'
+
+    @property
+    def available(self):
+        return self.stock - self.reserved
 
-    def generate_sku(self):
-        category_prefix = self.category.name[:3].upper()
-        category_id = f"{self.category.id:02d}"
-        item_id = f"{self.id:03d}"
-        return f"{category_prefix}{category_id}{item_id}"
+    @property
+    def below_reorder_level(self):
+        return self.available < self.reorder_level
 
     @property
     def total_production_cost(self):
@@ -52,6 +100,25 @@ class Item(models.Model):
             self.packaging_cost
         )
 
+class ItemSearch(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over item name, category name and SKU.
+
+    The virtual table and the triggers that keep it in step with Item and
+    Category are created by migration 0002 on SQLite only; other backends
+    search with icontains instead (see services.search_items).
+    """
+    item = models.OneToOneField(Item, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search')
+    name = models.TextField()
+    category = models.TextField()
+    sku = models.TextField()
+    document = SearchDocumentField(db_column='inventory_itemsearch')
+    rank = models.FloatField()  # bm25 score of the current MATCH, lower is better
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_itemsearch'
+
 class InventoryActivity(models.Model):
     ACTIVITY_TYPES = [
         ('ADD', 'Added to inventory'),
@@ -64,5 +131,77 @@ class InventoryActivity(models.Model):
     quantity = models.PositiveIntegerField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', 'timestamp']),
+            models.Index(fields=['timestamp']),
+        ]
+
     def __str__(self):
-        return f"{self.item.name} - {self.get_activity_type_display()}"
\ No newline at end of file
+        return f"{self.item.name} - {self.get_activity_type_display()}"
+
+
+class StockSnapshot(models.Model):
+    """
+    An item's stock at the end of `date`, built from the activity ledger by the
+    snapshot_stock command. Every snapshot date covers the whole catalogue, but
+    only items with stock get a row; a missing row means zero.
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField(db_index=True)
+    stock = models.IntegerField()
+
+    class Meta:
+        unique_together = ['item', 'date']
+        ordering = ['-date', 'item']
+
+    def __str__(self):
+        return f"{self.item.name} - {self.date}: {self.stock}"
+
+
+class StockAlert(models.Model):
+    """
+    An item's available stock crossing its reorder level, recorded by the stock
+    services in the same transaction as the change that caused it.
+    """
+    KINDS = [
+        ('LOW', 'Below reorder level'),
+        ('RESTOCKED', 'Back at reorder level'),
+    ]
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stock_alerts')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    available = models.IntegerField()
+    reorder_level = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.item.name} - {self.get_kind_display()} ({self.available}/{self.reorder_level})"
+
+
+VALUATION_VERSION_KEY = 'inventory:valuation:version'
+
+
+def forget_cached_items(skus=()):
+    """
+    Once the current transaction commits, drop the cached SKU lookups of these
+    items and retire every cached valuation report.
+    """
+    keys = [Item.cache_key(sku) for sku in skus if sku] + [VALUATION_VERSION_KEY]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def forget_cached_item(sender, instance, **kwargs):
+    forget_cached_items([instance.sku])
+
+
+@receiver(post_save, sender=Category)
+def forget_cached_category_items(sender, instance, created, **kwargs):
+    # Cached lookups embed the category name
+    if not created:
+        forget_cached_items(instance.items.values_list('sku', flat=True))
@@ -0,0 +1,53 @@
+# inventory/search.py
+"""
+Triggers that keep the inventory_itemsearch FTS5 table (migration 0002) in
+step with Item and Category, so bulk writes and raw SQL are covered as well
+as Model.save().
+
+SQLite rebuilds a table to alter most of its columns, and a trigger that
+refers to the table being rebuilt makes that fail. The triggers are therefore
+dropped before migrations run and reinstalled afterwards, and the index is
+refilled from scratch then (see InventoryConfig.ready).
+"""
+from core.search import drop_triggers, install_triggers
+
+TRIGGERS = {
+    'inventory_item_search_insert': """
+        CREATE TRIGGER inventory_item_search_insert AFTER INSERT ON inventory_item BEGIN
+            INSERT INTO inventory_itemsearch(rowid, name, category, sku)
+            SELECT new.id, new.name, c.name, coalesce(new.sku, '') FROM inventory_category c WHERE c.id = new.category_id;
+        END""",
+    'inventory_item_search_update': """
+        CREATE TRIGGER inventory_item_search_update AFTER UPDATE OF name, category_id, sku ON inventory_item BEGIN
+            UPDATE inventory_itemsearch
+            SET name = new.name,
+                category = (SELECT name FROM inventory_category WHERE id = new.category_id),
+                sku = coalesce(new.sku, '')
+            WHERE rowid = new.id;
+        END""",
+    'inventory_item_search_delete': """
+        CREATE TRIGGER inventory_item_search_delete AFTER DELETE ON inventory_item BEGIN
+            DELETE FROM inventory_itemsearch WHERE rowid = old.id;
+        END""",
+    'inventory_category_search_update': """
+        CREATE TRIGGER inventory_category_search_update AFTER UPDATE OF name ON inventory_category BEGIN
+            UPDATE inventory_itemsearch SET category = new.name
+            WHERE rowid IN (SELECT id FROM inventory_item WHERE category_id = new.id);
+        END""",
+}
+
+REFILL_SQL = [
+    "DELETE FROM inventory_itemsearch",
+    """INSERT INTO inventory_itemsearch(rowid, name, category, sku)
+       SELECT i.id, i.name, c.name, coalesce(i.sku, '')
+       FROM inventory_item i JOIN inventory_category c ON c.id = i.category_id""",
+]
+
+
+def drop_search_triggers(connection):
+    drop_triggers(connection, TRIGGERS)
+
+
+def install_search_triggers(connection):
+    """(Re)create the triggers and refill the index; does nothing until migration 0002 has created the table."""
+    install_triggers(connection, 'inventory_itemsearch', TRIGGERS, REFILL_SQL)
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Item, InventoryActivity
+from . import services
+from .models import Category, Item, InventoryActivity, StockAlert
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,26 +12,63 @@ class ItemSerializer(serializers.ModelSerializer):
     category = serializers.CharField(write_only=True)
     category_details = CategorySerializer(source='category', read_only=True)
     total_production_cost = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    available = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Item
-        fields = ['id', 'name', 'category', 'category_details', 'stock', 'sku', 'splitting_drawing_cost', 
+        fields = ['id', 'name', 'category', 'category_details', 'stock', 'reserved', 'available', 'reorder_level', 'sku', 'splitting_drawing_cost', 
                   'carving_cutting_cost', 'sanding_cost', 'painting_cost', 'finishing_cost', 
                   'packaging_cost', 'selling_price', 'total_production_cost']
-        read_only_fields = ['id', 'sku', 'total_production_cost']
+        read_only_fields = ['id', 'sku', 'reserved', 'total_production_cost']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Only a new item takes a stock figure; existing stock moves by deltas through
+            # the update_stock and batch_update_stock actions, so concurrent changes aren't lost
+            fields['stock'].read_only = True
+        return fields
 
     def create(self, validated_data):
         category_name = validated_data.pop('category')
         category, _ = Category.objects.get_or_create(name=category_name)
-        item = Item.objects.create(category=category, **validated_data)
-        return item
+        return Item.objects.create(category=category, **validated_data)
     
     def update(self, instance, validated_data):
         category_name = validated_data.pop('category', None)
         if category_name:
-            category, _ = Category.objects.get_or_create(name=category_name)
-            instance.category = category
-        return super().update(instance, validated_data)
+            validated_data['category'], _ = Category.objects.get_or_create(name=category_name)
+        was_below = instance.below_reorder_level
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+
+        with transaction.atomic():
+            # Only the fields sent are saved, so a stale copy can't overwrite the stock
+            # and reserved counts the stock services move concurrently
+            if validated_data:
+                instance.save(update_fields=list(validated_data))
+            if 'reorder_level' in validated_data:
+                # A new level can put the item on the other side of it without any stock moving
+                services.refresh_stock(instance)
+                services.record_alerts([(instance, was_below)])
+        return instance
+
+class ItemImportSerializer(serializers.ModelSerializer):
+    # Validates one import row; categories are resolved by name for the whole batch in services.import_items
+    category = serializers.CharField(max_length=100)
+
+    class Meta:
+        model = Item
+        fields = ['name', 'category', 'stock', 'reorder_level', 'splitting_drawing_cost', 'carving_cutting_cost', 'sanding_cost',
+                  'painting_cost', 'finishing_cost', 'packaging_cost', 'selling_price']
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    item_sku = serializers.CharField(source='item.sku', read_only=True)
+
+    class Meta:
+        model = StockAlert
+        fields = ['id', 'item', 'item_name', 'item_sku', 'kind', 'available', 'reorder_level', 'created_at']
 
 class InventoryActivitySerializer(serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
@@ -42,4 +81,40 @@ class InventoryActivitySerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         item_id = validated_data.pop('item_id')
         validated_data['item'] = item_id
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+
+class InventoryActivityListSerializer(serializers.ModelSerializer):
+    # Compact rows for the activity feed: the item's id, name and SKU instead of the whole nested item
+    item_id = serializers.IntegerField(read_only=True)
+    item_name = serializers.CharField(source='item.name', read_only=True)
+    item_sku = serializers.CharField(source='item.sku', read_only=True)
+
+    class Meta:
+        model = InventoryActivity
+        fields = ['id', 'item_id', 'item_name', 'item_sku', 'activity_type', 'quantity', 'timestamp']
+
+
+class ItemValuationSerializer(serializers.ModelSerializer):
+    # Reads the annotations added by services.with_valuation
+    category = serializers.CharField(source='category.name', read_only=True)
+    production_cost = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    unit_margin = serializers.DecimalField(max_digits=16, decimal_places=2, read_only=True)
+    stock_value_cost = serializers.DecimalField(max_digits=16, decimal_places=2, read_only=True)
+    stock_value_price = serializers.DecimalField(max_digits=16, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Item
+        fields = ['id', 'sku', 'name', 'category', 'stock', 'production_cost', 'selling_price', 'unit_margin',
+                  'stock_value_cost', 'stock_value_price']
+
+
+class CategoryValuationSerializer(serializers.Serializer):
+    # Rows of services.category_valuation
+    category_id = serializers.IntegerField(source='category')
+    category_name = serializers.CharField(source='category__name')
+    item_count = serializers.IntegerField()
+    total_stock = serializers.IntegerField()
+    total_value_cost = serializers.DecimalField(max_digits=18, decimal_places=2)
+    total_value_price = serializers.DecimalField(max_digits=18, decimal_places=2)
+    total_margin = serializers.DecimalField(max_digits=18, decimal_places=2)
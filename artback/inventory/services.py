@@ -0,0 +1,364 @@
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, IntegerField, Max, Min, Q, Sum, Value, When
+from django.utils import timezone
+
+from core.search import fts_enabled, fts_query
+
+from .models import BELOW_REORDER_LEVEL, Category, Item, InventoryActivity, StockAlert, StockSnapshot, forget_cached_items
+
+IMPORT_BATCH_SIZE = 2000
+RESERVE_BATCH_SIZE = 150  # Five query parameters per item, under SQLite's limit of 999
+
+# An activity's effect on stock; UPDATE entries carry no direction and count as zero
+SIGNED_QUANTITY = Case(
+    When(activity_type='ADD', then=F('quantity')),
+    When(activity_type='REMOVE', then=-F('quantity')),
+    default=Value(0),
+    output_field=IntegerField(),
+)
+
+PRODUCTION_COST = ExpressionWrapper(
+    F('splitting_drawing_cost') + F('carving_cutting_cost') + F('sanding_cost') +
+    F('painting_cost') + F('finishing_cost') + F('packaging_cost'),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+def with_valuation(queryset):
+    """
+    Annotate items with their production cost, unit margin and stock value at
+    cost and at selling price, all computed by the database so they can be
+    filtered and sorted on.
+    """
+    money = DecimalField(max_digits=16, decimal_places=2)
+    return queryset.annotate(production_cost=PRODUCTION_COST).annotate(
+        unit_margin=ExpressionWrapper(F('selling_price') - F('production_cost'), output_field=money),
+        stock_value_cost=ExpressionWrapper(F('stock') * F('production_cost'), output_field=money),
+        stock_value_price=ExpressionWrapper(F('stock') * F('selling_price'), output_field=money),
+    )
+
+
+def category_valuation(queryset):
+    """Per-category totals of with_valuation(queryset), one row per category."""
+    return with_valuation(queryset).values('category', 'category__name').annotate(
+        item_count=Count('id'),
+        total_stock=Sum('stock'),
+        total_value_cost=Sum('stock_value_cost'),
+        total_value_price=Sum('stock_value_price'),
+    ).annotate(
+        total_margin=ExpressionWrapper(
+            F('total_value_price') - F('total_value_cost'), output_field=DecimalField(max_digits=18, decimal_places=2)
+        ),
+    ).order_by('category__name')
+
+
+def search_items(queryset, text):
+    """
+    Filter items to those matching `text` in their name, category or SKU, best match first.
+
+    Each typed word matches as a prefix through the FTS5 index on SQLite;
+    other backends fall back to icontains with the queryset's own ordering.
+    """
+    if fts_enabled(connection):
+        query = fts_query(text)
+        if not query:
+            return queryset.none()
+        return queryset.filter(search__document__match=query).order_by('search__rank')
+    return queryset.filter(
+        Q(name__icontains=text) |
+        Q(category__name__icontains=text) |
+        Q(sku__icontains=text)
+    )
+
+
+def below_reorder_level(queryset):
+    """Items whose available stock is under their own reorder level, read through the partial index."""
+    return queryset.filter(BELOW_REORDER_LEVEL)
+
+
+class InsufficientStock(Exception):
+    """Raised when a stock decrement or reservation needs more units than the item has available."""
+
+
+def log_activity(item, change):
+    if change:
+        InventoryActivity.objects.create(
+            item=item,
+            activity_type='ADD' if change > 0 else 'REMOVE',
+            quantity=abs(change),
+        )
+
+
+def refresh_stock(item):
+    item.stock, item.reserved, item.reorder_level = Item.objects.values_list(
+        'stock', 'reserved', 'reorder_level'
+    ).get(pk=item.pk)
+
+
+def record_alerts(changes):
+    """
+    Log a StockAlert for each item that crossed its reorder level. `changes` is
+    [(item, was_below)], each item holding its current stock, reserved and
+    reorder_level; one INSERT at most.
+    """
+    StockAlert.objects.bulk_create([
+        StockAlert(
+            item=item,
+            kind='LOW' if item.below_reorder_level else 'RESTOCKED',
+            available=item.available,
+            reorder_level=item.reorder_level,
+        )
+        for item, was_below in changes
+        if item.below_reorder_level != was_below
+    ])
+
+
+def adjust_stock(item, change):
+    """
+    Add `change` (negative to remove) to an item's stock and log the activity.
+
+    Every stock mutation goes through here or set_stocks. The change is applied
+    as a single UPDATE of the stock column (stock = stock + change), guarded by
+    stock - reserved >= -change for removals, so concurrent requests can't
+    overwrite each other and units held for orders can't be removed.
+    Crossing the reorder level records a StockAlert.
+    `item.stock` is refreshed; returns (old_stock, new_stock).
+    """
+    with transaction.atomic():
+        items = Item.objects.filter(pk=item.pk)
+        if change < 0:
+            items = items.filter(stock__gte=F('reserved') - change)
+        if not items.update(stock=F('stock') + change):
+            raise InsufficientStock(f'Insufficient stock for {item.name}: cannot remove {-change}.')
+        refresh_stock(item)
+        log_activity(item, change)
+        record_alerts([(item, item.available - change < item.reorder_level)])
+        forget_cached_items([item.sku])
+    return item.stock - change, item.stock
+
+
+def reserve_stock(item, quantity):
+    """
+    Hold `quantity` units of an item for an order line.
+
+    A single UPDATE of the reserved column guarded by
+    stock - reserved >= quantity, so two orders can never both take the last
+    unit. Raises InsufficientStock when not enough is available.
+    """
+    if quantity <= 0:
+        return
+    with transaction.atomic():
+        if not Item.objects.filter(pk=item.pk, stock__gte=F('reserved') + quantity).update(reserved=F('reserved') + quantity):
+            raise InsufficientStock(f'Insufficient stock for {item.name}: cannot reserve {quantity}.')
+        refresh_stock(item)
+        record_alerts([(item, item.available + quantity < item.reorder_level)])
+        forget_cached_items([item.sku])
+
+
+def reserve_stocks(quantities):
+    """
+    Hold stock for many items at once from {item_id: quantity}, all or nothing.
+
+    One UPDATE per RESERVE_BATCH_SIZE items, each row guarded by
+    stock - reserved >= its quantity as in reserve_stock, then one read of
+    the new counts. If any row falls short nothing is reserved and
+    InsufficientStock names the item. Returns {item_id: Item}.
+    """
+    ids = list(quantities)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                for start in range(0, len(ids), RESERVE_BATCH_SIZE):
+                    batch = ids[start:start + RESERVE_BATCH_SIZE]
+                    held = Case(*(When(pk=item_id, then=Value(quantities[item_id])) for item_id in batch),
+                                output_field=IntegerField())
+                    reserved = Item.objects.filter(pk__in=batch, stock__gte=F('reserved') + held).update(
+                        reserved=F('reserved') + held,
+                    )
+                    if reserved != len(batch):
+                        raise InsufficientStock
+        except InsufficientStock:
+            # The savepoint is rolled back, so these are the counts the guards saw
+            for item_id, name, stock, held in Item.objects.filter(pk__in=ids).values_list('id', 'name', 'stock', 'reserved'):
+                if stock - held < quantities[item_id]:
+                    raise InsufficientStock(f'Insufficient stock for {name}: cannot reserve {quantities[item_id]}.')
+            raise InsufficientStock('Insufficient stock.')
+
+        items = Item.objects.only('id', 'name', 'sku', 'stock', 'reserved', 'reorder_level').in_bulk(ids)
+        record_alerts((item, item.available + quantities[item.pk] < item.reorder_level) for item in items.values())
+        forget_cached_items(item.sku for item in items.values())
+    return items
+
+
+def release_stock(item, quantity):
+    """Give back units held by reserve_stock."""
+    if quantity <= 0:
+        return
+    with transaction.atomic():
+        Item.objects.filter(pk=item.pk).update(
+            reserved=Case(When(reserved__gte=quantity, then=F('reserved') - quantity), default=Value(0)),
+        )
+        refresh_stock(item)
+        record_alerts([(item, item.available - quantity < item.reorder_level)])
+        forget_cached_items([item.sku])
+
+
+def fulfil_reservation(item, quantity):
+    """Ship units held by reserve_stock: stock and reserved drop together and the removal is logged."""
+    if quantity <= 0:
+        return
+    with transaction.atomic():
+        fulfilled = Item.objects.filter(pk=item.pk, reserved__gte=quantity, stock__gte=quantity).update(
+            stock=F('stock') - quantity,
+            reserved=F('reserved') - quantity,
+        )
+        if not fulfilled:
+            raise InsufficientStock(f'Insufficient stock for {item.name}: cannot ship {quantity}.')
+        refresh_stock(item)
+        log_activity(item, -quantity)
+        forget_cached_items([item.sku])
+
+
+def set_stocks(new_stocks):
+    """
+    Set the stock of many items at once from {item_id: new_stock}, e.g. a stock-take.
+
+    One in_bulk read, one bulk_update of the stock column and one bulk_create
+    each of the activities and the reorder alerts (each split only by the
+    backend's parameter limit), all in one transaction. Raises Item.DoesNotExist naming the first unknown id,
+    and InsufficientStock if a new stock is negative or below the units reserved.
+    Returns [(item, old_stock, new_stock)] in the order given.
+    """
+    with transaction.atomic():
+        items = Item.objects.select_for_update().only(
+            'id', 'name', 'sku', 'stock', 'reserved', 'reorder_level'
+        ).in_bulk(list(new_stocks))
+        missing = [item_id for item_id in new_stocks if item_id not in items]
+        if missing:
+            raise Item.DoesNotExist(f'Item with id {missing[0]} not found')
+
+        results = []
+        for item_id, new_stock in new_stocks.items():
+            item = items[item_id]
+            if new_stock < 0:
+                raise InsufficientStock(f'Stock for {item.name} cannot be negative.')
+            if new_stock < item.reserved:
+                # Reserved units belong to open orders; counting fewer means releasing those first
+                raise InsufficientStock(
+                    f'Stock for {item.name} cannot be set to {new_stock}; {item.reserved} units are reserved.'
+                )
+            results.append((item, item.stock, new_stock))
+            item.stock = new_stock
+
+        changed = [(item, old_stock, new_stock) for item, old_stock, new_stock in results if new_stock != old_stock]
+        Item.objects.bulk_update([item for item, _, _ in changed], ['stock'])
+        InventoryActivity.objects.bulk_create(
+            InventoryActivity(
+                item=item,
+                activity_type='ADD' if new_stock > old_stock else 'REMOVE',
+                quantity=abs(new_stock - old_stock),
+            )
+            for item, old_stock, new_stock in changed
+        )
+        record_alerts((item, old_stock - item.reserved < item.reorder_level) for item, old_stock, _ in changed)
+        forget_cached_items(item.sku for item, _, _ in changed)
+    return results
+
+
+def resolve_categories(names):
+    """{name: Category} for the given names, creating the missing ones; two or three queries in all."""
+    categories = Category.objects.in_bulk(names, field_name='name')
+    missing = set(names) - categories.keys()
+    if missing:
+        Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+        categories = Category.objects.in_bulk(names, field_name='name')
+    return categories
+
+
+def import_items(rows):
+    """
+    Create items from validated import rows, which name their category.
+
+    Each batch resolves its categories at once, inserts its items with
+    bulk_create and then sets their SKUs with one UPDATE per category, so
+    the number of queries grows with batches rather than rows. Returns the
+    number of items created.
+    """
+    created = 0
+    with transaction.atomic():
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            batch = rows[start:start + IMPORT_BATCH_SIZE]
+            categories = resolve_categories({row['category'] for row in batch})
+            items = Item.objects.bulk_create([
+                Item(**{**row, 'category': categories[row['category']]}) for row in batch
+            ])
+            first_id, last_id = min(item.id for item in items), max(item.id for item in items)
+            for category in {item.category for item in items}:
+                Item.objects.filter(
+                    category=category, id__range=(first_id, last_id), sku__isnull=True,
+                ).update(sku=Item.sku_expression(category))
+            InventoryActivity.objects.bulk_create(
+                InventoryActivity(item=item, activity_type='ADD', quantity=item.stock)
+                for item in items if item.stock
+            )
+            created += len(items)
+        forget_cached_items()
+    return created
+
+
+def end_of_day(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def net_changes(start=None, end=None):
+    """{item_id: net stock change} over the activities logged in [start, end)."""
+    activities = InventoryActivity.objects.all()
+    if start is not None:
+        activities = activities.filter(timestamp__gte=start)
+    if end is not None:
+        activities = activities.filter(timestamp__lt=end)
+    return dict(activities.values('item').annotate(change=Sum(SIGNED_QUANTITY)).values_list('item', 'change').order_by())
+
+
+def snapshot_stock(day):
+    return dict(StockSnapshot.objects.filter(date=day).values_list('item', 'stock'))
+
+
+def stock_as_of(day):
+    """
+    {item_id: stock} at the end of `day` for every item that had stock then.
+
+    Starts from whichever anchor is nearest to the day, either the closest
+    snapshot on either side or the live stock, and replays only the
+    activities between the anchor and the day: forwards from an earlier
+    snapshot, backwards from a later one.
+    """
+    before = StockSnapshot.objects.filter(date__lte=day).aggregate(date=Max('date'))['date']
+    after = StockSnapshot.objects.filter(date__gt=day).aggregate(date=Min('date'))['date']
+    today = timezone.localdate()
+
+    if before is not None and (day - before) <= ((after or today) - day):
+        stock, changes = snapshot_stock(before), net_changes(end_of_day(before), end_of_day(day))
+    else:
+        if after is not None:
+            stock, changes = snapshot_stock(after), net_changes(end_of_day(day), end_of_day(after))
+        else:
+            stock, changes = dict(Item.objects.filter(stock__gt=0).values_list('id', 'stock')), net_changes(end_of_day(day))
+        changes = {item_id: -change for item_id, change in changes.items()}
+
+    for item_id, change in changes.items():
+        stock[item_id] = stock.get(item_id, 0) + change
+    return {item_id: count for item_id, count in stock.items() if count}
+
+
+def take_snapshot(day):
+    """Store the stock of every item at the end of `day`, replacing any snapshot already taken for it."""
+    stock = stock_as_of(day)
+    with transaction.atomic():
+        StockSnapshot.objects.filter(date=day).delete()
+        StockSnapshot.objects.bulk_create(
+            StockSnapshot(item_id=item_id, date=day, stock=count) for item_id, count in stock.items()
+        )
+    return len(stock)
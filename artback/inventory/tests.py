@@ -1,3 +1,147 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from math import ceil
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import services
+from .models import Category, Item, InventoryActivity
+from .serializers import ItemSerializer
+
+THREADS = 8
+ITERATIONS = 100
+STOCK_TAKE_SIZES = [10, 500, 3000]
+
+
+def batches(rows, fields):
+    """Statements a bulk write of `rows` objects over `fields` is split into by the backend's parameter limit."""
+    return ceil(rows / connection.ops.bulk_batch_size(fields, [None] * rows))
+
+
+def stock_take_queries(lines):
+    """What set_stocks should cost for a stock-take that changes every one of `lines` items."""
+    activity_fields = [field for field in InventoryActivity._meta.concrete_fields if not field.primary_key]
+    return (
+        2  # Savepoint and release of the transaction
+        + ceil(lines / connection.features.max_query_params)  # in_bulk read
+        + batches(lines, ['pk', 'pk', 'stock'])  # bulk_update of the stock column
+        + batches(lines, activity_fields)  # bulk_create of the activities
+    )
+
+
+def hammer(item_id, changes):
+    # Runs in a pool thread; Django gives each thread its own connection
+    try:
+        item = Item.objects.get(pk=item_id)
+        rejected = 0
+        for change in changes:
+            try:
+                services.adjust_stock(item, change)
+            except services.InsufficientStock:
+                rejected += 1
+        return rejected
+    finally:
+        connection.close()
+
+
+class ConcurrentStockTests(TransactionTestCase):
+    """Stock changes made from many connections at once are neither lost nor allowed below zero."""
+
+    def test_concurrent_adjustments(self):
+        category = Category.objects.create(name='Carvings')
+        item = Item.objects.create(name='Giraffe', category=category, stock=0, selling_price=0)
+        # Alternating +3 / -2 from an empty stock makes removals race against the zero floor
+        changes = [3 if i % 2 else -2 for i in range(ITERATIONS)]
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            rejected = sum(pool.map(lambda _: hammer(item.pk, changes), range(THREADS)))
+
+        # Every rejected change is a removal
+        applied = THREADS * len(changes) - rejected
+        item.refresh_from_db()
+        self.assertEqual(item.stock, THREADS * sum(changes) + rejected * -min(changes))
+        self.assertGreaterEqual(item.stock, 0)
+        self.assertEqual(InventoryActivity.objects.filter(item=item).count(), applied)
+
+
+class StockTakeQueryTests(TestCase):
+    """
+    A stock-take costs a fixed handful of statements, growing only with the
+    backend's parameter limit, and never counts an item below its reservations.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Carvings')
+        # A zero reorder level keeps alerts out of it; they are a single extra INSERT when they happen
+        cls.items = Item.objects.bulk_create(
+            Item(name=f'Item {n}', category=category, stock=n % 40, reorder_level=0, selling_price=0)
+            for n in range(max(STOCK_TAKE_SIZES))
+        )
+
+    def test_set_stocks(self):
+        for lines in STOCK_TAKE_SIZES:
+            with self.subTest(lines=lines):
+                new_stocks = {item.pk: item.stock + 1 + n % 3 for n, item in enumerate(self.items[:lines])}
+                with self.assertNumQueries(stock_take_queries(lines)):
+                    results = services.set_stocks(new_stocks)
+                self.assertEqual(len(results), lines)
+                self.assertEqual(dict(Item.objects.filter(pk__in=new_stocks).values_list('pk', 'stock')), new_stocks)
+                self.assertEqual(InventoryActivity.objects.filter(item__in=self.items[:lines]).count(), lines)
+                InventoryActivity.objects.all().delete()
+                Item.objects.bulk_update(self.items[:lines], ['stock'])
+
+    def test_stock_take_below_reserved_is_refused(self):
+        reserved, other = Item.objects.filter(pk__in=[self.items[0].pk, self.items[1].pk]).order_by('pk')
+        reserved.stock, reserved.reserved = 10, 6
+        reserved.save(update_fields=['stock', 'reserved'])
+
+        with self.assertRaises(services.InsufficientStock):
+            services.set_stocks({other.pk: other.stock + 5, reserved.pk: 5})
+        self.assertEqual(Item.objects.get(pk=reserved.pk).stock, 10)
+        self.assertEqual(Item.objects.get(pk=other.pk).stock, other.stock)
+        self.assertFalse(InventoryActivity.objects.exists())
+
+        services.set_stocks({reserved.pk: 6})
+        self.assertEqual(Item.objects.get(pk=reserved.pk).available, 0)
+
+
+class ItemUpdateTests(TestCase):
+    def test_edit_keeps_concurrent_reservations(self):
+        item = Item.objects.create(name='Giraffe', category=Category.objects.create(name='Carvings'), stock=10, selling_price=25)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='clerk'))
+        stale = Item.objects.get(pk=item.pk)
+
+        # Units are reserved between the edit form loading the item and saving it
+        services.reserve_stock(item, 7)
+        serializer = ItemSerializer(stale, data={'name': 'Tall giraffe'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        item.refresh_from_db()
+        self.assertEqual((item.name, item.stock, item.reserved), ('Tall giraffe', 10, 7))
+
+        response = client.patch(f'/api/items/{item.pk}/', {'category': 'Masks', 'selling_price': '30.00'},
+                                format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual((item.category.name, item.reserved), ('Masks', 7))
+
+
+class StockAsOfTests(TestCase):
+    def test_item_has_no_stock_before_it_existed(self):
+        category = Category.objects.create(name='Carvings')
+        item = Item.objects.create(name='Giraffe', category=category, stock=12, selling_price=25)
+        imported = services.import_items([{'name': 'Mask', 'category': 'Masks', 'stock': 5, 'selling_price': 10}])
+        self.assertEqual(imported, 1)
+        mask = Item.objects.get(name='Mask')
+
+        today = timezone.localdate()
+        self.assertEqual(services.stock_as_of(today - timedelta(days=1)), {})
+        self.assertEqual(services.stock_as_of(today), {item.pk: 12, mask.pk: 5})
+        self.assertEqual(list(item.activities.values_list('activity_type', 'quantity')), [('ADD', 12)])
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ItemViewSet, CategoryViewSet, InventoryActivityViewSet
+from .views import ItemViewSet, CategoryViewSet, InventoryActivityViewSet, StockAlertViewSet
 
 router = DefaultRouter()
 router.register(r'items', ItemViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'inventory-activities', InventoryActivityViewSet)
+router.register(r'stock-alerts', StockAlertViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,15 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db import transaction
-from django.db.models import Q
-from .models import Category, Item, InventoryActivity
-from .serializers import CategorySerializer, ItemSerializer, InventoryActivitySerializer
+from . import services
+from .models import Category, Item, InventoryActivity, StockAlert, VALUATION_VERSION_KEY
+from .serializers import (
+    CategorySerializer, ItemSerializer, ItemImportSerializer, InventoryActivitySerializer, InventoryActivityListSerializer,
+    ItemValuationSerializer, CategoryValuationSerializer, StockAlertSerializer,
+)
 
+import csv
+import io
 import logging
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
+VALUATION_ORDERING = {
+    'name', 'stock', 'production_cost', 'selling_price', 'unit_margin', 'stock_value_cost', 'stock_value_price',
+}
+
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -39,11 +54,7 @@ class ItemViewSet(viewsets.ModelViewSet):
         search_query = request.query_params.get('search', '')
         
         if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(category__name__icontains=search_query) |
-                Q(sku__icontains=search_query)
-            )
+            queryset = services.search_items(queryset, search_query)
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -53,6 +64,45 @@ class ItemViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    def items_by_sku(self, skus):
+        """
+        Serialized items for the given SKUs as {sku: data}; unknown SKUs are left out.
+        Hits come from the cache, and all the misses are read with one query.
+        """
+        cached = cache.get_many([Item.cache_key(sku) for sku in skus])
+        found = {data['sku']: data for data in cached.values()}
+        missing = [sku for sku in skus if sku not in found]
+        if missing:
+            fresh = {
+                item.sku: dict(ItemSerializer(item).data)
+                for item in Item.objects.select_related('category').filter(sku__in=missing)
+            }
+            cache.set_many({Item.cache_key(sku): data for sku, data in fresh.items()}, settings.ITEM_CACHE_TIMEOUT)
+            found.update(fresh)
+        return found
+
+    @action(detail=False, methods=['get'], url_path=r'by-sku/(?P<sku>[^/.]+)')
+    def by_sku(self, request, sku=None):
+        # Exact SKU lookup for barcode scanners
+        sku = sku.strip().upper()
+        item = self.items_by_sku([sku]).get(sku)
+        if item is None:
+            return Response({'error': f'No item with SKU {sku}'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(item)
+
+    @action(detail=False, methods=['post'], url_path='by-sku')
+    def by_sku_batch(self, request):
+        skus = request.data.get('skus', [])
+        if not isinstance(skus, list) or not skus:
+            return Response({'error': 'skus must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        skus = list(dict.fromkeys(str(sku).strip().upper() for sku in skus))
+        found = self.items_by_sku(skus)
+        return Response({
+            'items': [found[sku] for sku in skus if sku in found],
+            'missing': [sku for sku in skus if sku not in found],
+        })
+
     @action(detail=True, methods=['post'])
     def update_stock(self, request, pk=None):
         item = self.get_object()
@@ -69,23 +119,17 @@ class ItemViewSet(viewsets.ModelViewSet):
         if stock_to_add == 0:
             return Response({'error': 'Stock to add must be non-zero'}, status=status.HTTP_400_BAD_REQUEST)
         
-        old_stock = item.stock
-        item.stock += stock_to_add
-        item.save()
-
-        activity_type = 'ADD' if stock_to_add > 0 else 'REMOVE'
-        InventoryActivity.objects.create(
-            item=item,
-            activity_type=activity_type,
-            quantity=abs(stock_to_add)
-        )
+        try:
+            old_stock, new_stock = services.adjust_stock(item, stock_to_add)
+        except services.InsufficientStock as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             'success': 'Stock updated successfully',
             'item_id': item.id,
             'item_name': item.name,
             'old_stock': old_stock,
-            'new_stock': item.stock,
+            'new_stock': new_stock,
             'change': stock_to_add
         }, status=status.HTTP_200_OK)
 
@@ -96,47 +140,141 @@ class ItemViewSet(viewsets.ModelViewSet):
         if not items_data:
             return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        updated_items = []
-        with transaction.atomic():
-            for item_data in items_data:
-                for item_id, new_stock in item_data.items():
-                    try:
-                        item = Item.objects.get(id=int(item_id))
-                    except Item.DoesNotExist:
-                        return Response({'error': f'Item with id {item_id} not found'}, status=status.HTTP_404_NOT_FOUND)
-                    except ValueError:
-                        return Response({'error': f'Invalid item id: {item_id}'}, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    try:
-                        new_stock = int(new_stock)
-                    except ValueError:
-                        return Response({'error': f'Invalid stock value for item {item_id}: {new_stock}'}, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    old_stock = item.stock
-                    stock_change = new_stock - old_stock
-                    item.stock = new_stock
-                    item.save()
-                    
-                    activity_type = 'ADD' if stock_change > 0 else 'REMOVE'
-                    InventoryActivity.objects.create(
-                        item=item,
-                        activity_type=activity_type,
-                        quantity=abs(stock_change)
-                    )
-                    
-                    updated_items.append({
-                        'item_id': item.id,
-                        'item_name': item.name,
-                        'old_stock': old_stock,
-                        'new_stock': new_stock,
-                        'change': stock_change
-                    })
-        
+        # Validate the whole payload before touching the database; a later entry for the same id wins
+        new_stocks = {}
+        for item_data in items_data:
+            for item_id, new_stock in item_data.items():
+                try:
+                    item_id = int(item_id)
+                except ValueError:
+                    return Response({'error': f'Invalid item id: {item_id}'}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    new_stocks[item_id] = int(new_stock)
+                except (TypeError, ValueError):
+                    return Response({'error': f'Invalid stock value for item {item_id}: {new_stock}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = services.set_stocks(new_stocks)
+        except Item.DoesNotExist as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except services.InsufficientStock as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_items = [
+            {
+                'item_id': item.id,
+                'item_name': item.name,
+                'old_stock': old_stock,
+                'new_stock': new_stock,
+                'change': new_stock - old_stock
+            }
+            for item, old_stock, new_stock in results
+        ]
+
         return Response({
             'message': 'Stocks updated successfully',
             'updated_items': updated_items
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_items(self, request):
+        # Accepts a JSON list of items ({"items": [...]}) or a CSV upload in the "file" field,
+        # with columns named like the item fields and the category given by name
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = list(csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig')))
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({'error': f'Could not read CSV: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('items', [])
+
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ItemImportSerializer(data=rows, many=True)
+        if not serializer.is_valid():
+            errors = [{'row': number, 'errors': row_errors}
+                      for number, row_errors in enumerate(serializer.errors, start=1) if row_errors]
+            return Response({'error': 'Invalid rows', 'rows': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = services.import_items(serializer.validated_data)
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+    def cached_report(self, request, build):
+        """
+        Serve build() from the cache, keyed on the query string and the current
+        report version; any item change retires the version (forget_cached_items).
+        """
+        version = cache.get_or_set(VALUATION_VERSION_KEY, lambda: uuid.uuid4().hex, None)
+        key = f"inventory:valuation:{version}:{request.path}?{urlencode(sorted(request.query_params.items()))}"
+        data = cache.get(key)
+        if data is None:
+            data = build()
+            cache.set(key, data, settings.ITEM_CACHE_TIMEOUT)
+        return Response(data)
+
+    def valuation_queryset(self, request):
+        # ?category=<id>, ?in_stock=true and a ?min_margin= / ?max_margin= unit margin range
+        queryset = services.with_valuation(Item.objects.all())
+        params = request.query_params
+        try:
+            if params.get('category'):
+                queryset = queryset.filter(category_id=int(params['category']))
+            if params.get('min_margin'):
+                queryset = queryset.filter(unit_margin__gte=Decimal(params['min_margin']))
+            if params.get('max_margin'):
+                queryset = queryset.filter(unit_margin__lte=Decimal(params['max_margin']))
+        except (ValueError, InvalidOperation):
+            raise ValidationError({'error': 'category must be an id and min_margin/max_margin numbers.'})
+        if params.get('in_stock') == 'true':
+            queryset = queryset.filter(stock__gt=0)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        # Per-item stock value and margin, sortable with ?ordering=<field> or -<field>
+        ordering = request.query_params.get('ordering', 'name')
+        if ordering.lstrip('-') not in VALUATION_ORDERING:
+            return Response({'error': f"ordering must be one of {', '.join(sorted(VALUATION_ORDERING))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.valuation_queryset(request).select_related('category').order_by(ordering, 'id')
+
+        def build():
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(ItemValuationSerializer(page, many=True).data).data
+            return ItemValuationSerializer(queryset, many=True).data
+
+        return self.cached_report(request, build)
+
+    @action(detail=False, methods=['get'], url_path='valuation/categories')
+    def category_valuation(self, request):
+        queryset = self.valuation_queryset(request)
+
+        def build():
+            return CategoryValuationSerializer(services.category_valuation(queryset), many=True).data
+
+        return self.cached_report(request, build)
+
+    @action(detail=False, methods=['get'], url_path='stock-as-of')
+    def stock_as_of(self, request):
+        # Stock of every item at the end of ?date=YYYY-MM-DD, from the nearest snapshot plus the activity ledger
+        try:
+            day = datetime.strptime(request.query_params.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stock = services.stock_as_of(day)
+        items = Item.objects.order_by('id').values('id', 'sku', 'name')
+        return Response({
+            'date': day,
+            'items': [
+                {'item_id': item['id'], 'sku': item['sku'], 'name': item['name'], 'stock': stock.get(item['id'], 0)}
+                for item in items.iterator()
+            ],
+        })
+
     def update(self, request, *args, **kwargs):
         # Remove 'sku' from the request data if it's present
         if 'sku' in request.data:
@@ -152,16 +290,20 @@ class ItemViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        threshold = int(request.query_params.get('threshold', 50))
+        # Items below their own reorder level, or below a global ?threshold= when one is given
+        threshold = request.query_params.get('threshold')
         search_query = request.query_params.get('search', '')
-        
-        low_stock_items = Item.objects.filter(stock__lt=threshold)
+
+        if threshold is None:
+            low_stock_items = services.below_reorder_level(Item.objects.order_by('name'))
+        else:
+            try:
+                low_stock_items = Item.objects.filter(stock__lt=int(threshold))
+            except ValueError:
+                return Response({'error': 'Threshold must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
         
         if search_query:
-            low_stock_items = low_stock_items.filter(
-                Q(name__icontains=search_query) |
-                Q(category__name__icontains=search_query)
-            )
+            low_stock_items = services.search_items(low_stock_items, search_query)
         
         page = self.paginate_queryset(low_stock_items)
         if page is not None:
@@ -172,5 +314,62 @@ class ItemViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 class InventoryActivityViewSet(viewsets.ModelViewSet):
-    queryset = InventoryActivity.objects.all()
-    serializer_class = InventoryActivitySerializer
\ No newline at end of file
+    queryset = InventoryActivity.objects.select_related('item__category').order_by('-timestamp', '-id')
+    serializer_class = InventoryActivitySerializer
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return InventoryActivityListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        # Feed filters: ?item=<id>, ?type=ADD|REMOVE|UPDATE and an inclusive ?from=/?to= date range
+        queryset = queryset.select_related(None).select_related('item')
+        params = self.request.query_params
+        if params.get('item'):
+            try:
+                queryset = queryset.filter(item_id=int(params['item']))
+            except ValueError:
+                raise ValidationError({'error': 'Invalid item id.'})
+        if params.get('type'):
+            if params['type'] not in dict(InventoryActivity.ACTIVITY_TYPES):
+                raise ValidationError({'error': 'Invalid activity type.'})
+            queryset = queryset.filter(activity_type=params['type'])
+        try:
+            if params.get('from'):
+                first_day = datetime.strptime(params['from'], '%Y-%m-%d').date()
+                queryset = queryset.filter(timestamp__gte=services.end_of_day(first_day - timedelta(days=1)))
+            if params.get('to'):
+                last_day = datetime.strptime(params['to'], '%Y-%m-%d').date()
+                queryset = queryset.filter(timestamp__lt=services.end_of_day(last_day))
+        except ValueError:
+            raise ValidationError({'error': 'Invalid date format. Use YYYY-MM-DD.'})
+        return queryset
+
+class StockAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Reorder-level crossings, newest first. ?item=<id> and ?kind=LOW|RESTOCKED
+    filter; ?after=<alert id> returns only alerts newer than one already seen.
+    """
+    queryset = StockAlert.objects.select_related('item')
+    serializer_class = StockAlertSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        try:
+            if params.get('item'):
+                queryset = queryset.filter(item_id=int(params['item']))
+            if params.get('after'):
+                queryset = queryset.filter(id__gt=int(params['after']))
+        except ValueError:
+            raise ValidationError({'error': 'item and after must be integer ids.'})
+        if params.get('kind'):
+            if params['kind'] not in dict(StockAlert.KINDS):
+                raise ValidationError({'error': 'Invalid alert kind.'})
+            queryset = queryset.filter(kind=params['kind'])
+        return queryset
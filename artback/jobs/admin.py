@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'worker', 'attempts', 'created_at', 'heartbeat_at', 'finished_at']
+    list_filter = ['status', 'kind']
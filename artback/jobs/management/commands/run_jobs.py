@@ -0,0 +1,36 @@
+# jobs/management/commands/run_jobs.py
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import registry
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs, enqueuing the scheduled ones (see registry.scheduled_job) when due. '
+            'Safe to start several of these processes side by side.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Job worker {worker} started')
+
+        while True:
+            # Like a request boundary: drop connections that errored or outlived CONN_MAX_AGE
+            close_old_connections()
+            registry.enqueue_due()
+            job = registry.claim_next(worker)
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f'Running {job}')
+            registry.run(job)
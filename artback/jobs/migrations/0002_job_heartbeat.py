@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-17 20:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_heartbeats(apps, schema_editor):
+    # Jobs claimed before heartbeats existed last showed signs of life when they started
+    Job = apps.get_model('jobs', 'Job')
+    Job.objects.exclude(started_at=None).update(heartbeat_at=F('started_at'), attempts=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_heartbeats, migrations.RunPython.noop),
+    ]
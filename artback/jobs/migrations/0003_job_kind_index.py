@@ -0,0 +1,17 @@
+# Generated by Django 5.1 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['kind', 'created_at'], name='jobs_job_kind_fbc839_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# jobs/models.py
+from django.db import models
+from django.utils import timezone
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)  # Name a handler was registered under in jobs.registry
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    progress = models.PositiveSmallIntegerField(default=0)  # Percent complete
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)  # Worker that claimed the job
+    attempts = models.PositiveSmallIntegerField(default=0)  # Times a worker has claimed the job
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last sign of life from the running worker
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['kind', 'created_at']),  # Read by registry.enqueue_due on every worker poll
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} - {self.get_status_display()}"
+
+    def set_progress(self, progress):
+        # Doubles as the heartbeat: a running job that stops reporting is presumed dead (see registry.reap_stale)
+        self.progress = max(0, min(int(progress), 100))
+        self.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, heartbeat_at=self.heartbeat_at)
@@ -0,0 +1,113 @@
+# jobs/registry.py
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+SCHEDULES = {}  # kind: how often workers enqueue it
+# A running job whose worker hasn't reported progress for this long is presumed dead
+STALE_AFTER = timedelta(minutes=15)
+MAX_ATTEMPTS = 3
+
+_next_reap = None  # When this process's claim_next next looks for stale jobs
+
+
+def job_handler(kind):
+    """Register `func(job)` as the handler for jobs of `kind`; its return value is stored as the result."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def scheduled_job(kind, every):
+    """Register `func(job)` for `kind` like job_handler, and have workers enqueue it every `every` (a timedelta)."""
+    def register(func):
+        SCHEDULES[kind] = every
+        return job_handler(kind)(func)
+    return register
+
+
+def enqueue(kind, **payload):
+    if kind not in HANDLERS:
+        raise ValueError(f'No job handler registered for "{kind}"')
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_once(kind, **payload):
+    """Return the queued or running job with the same kind and payload, enqueuing one if there is none."""
+    # One transaction, so two callers can't both miss the job and enqueue it twice:
+    # IMMEDIATE transactions take the write lock up front and run one at a time
+    with transaction.atomic():
+        reap_stale()
+        job = Job.objects.filter(kind=kind, payload=payload, status__in=['QUEUED', 'RUNNING']).first()
+        return job or enqueue(kind, **payload)
+
+
+def enqueue_due():
+    """Enqueue every scheduled kind that hasn't been enqueued within its interval."""
+    now = timezone.now()
+    for kind, every in SCHEDULES.items():
+        if not Job.objects.filter(kind=kind, created_at__gt=now - every).exists():
+            enqueue_once(kind)
+
+
+def reap_stale():
+    """
+    Take back the running jobs whose worker stopped heartbeating, most
+    likely because it died mid-job. Each goes back on the queue, unless it
+    has already been claimed MAX_ATTEMPTS times, in which case it fails.
+    """
+    stale = Job.objects.filter(status='RUNNING', heartbeat_at__lt=timezone.now() - STALE_AFTER)
+    error = f'Worker stopped responding for over {STALE_AFTER}.'
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(status='FAILED', error=error, finished_at=timezone.now())
+    stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='QUEUED', error=error, worker='')
+
+
+def claim_next(worker):
+    """
+    Claim the oldest queued job for `worker`, or return None if the queue is empty.
+
+    The claim is a conditional UPDATE on status, so when several worker
+    processes race for the same row exactly one of them wins it.
+    """
+    global _next_reap
+    # A job only goes stale after STALE_AFTER, so looking more often than that
+    # would just add writes contending for the lock on every poll
+    if _next_reap is None or timezone.now() >= _next_reap:
+        reap_stale()
+        _next_reap = timezone.now() + STALE_AFTER
+    while True:
+        job_id = Job.objects.filter(status='QUEUED').order_by('created_at', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status='QUEUED').update(
+            status='RUNNING', worker=worker, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+
+
+def run(job):
+    """
+    Run a claimed job's handler and record its outcome. Handlers of long jobs
+    should call job.set_progress() more often than STALE_AFTER.
+    """
+    # Only the claim this run belongs to may finish the job; a reaped and reclaimed job belongs to another
+    claim = Job.objects.filter(pk=job.pk, status='RUNNING', attempts=job.attempts)
+    try:
+        result = HANDLERS[job.kind](job)
+    except Exception:
+        logger.exception(f'Job {job.id} ({job.kind}) failed')
+        claim.update(status='FAILED', error=traceback.format_exc(), finished_at=timezone.now())
+    else:
+        claim.update(status='DONE', progress=100, result=result, error='', finished_at=timezone.now())
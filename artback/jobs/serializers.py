@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'result', 'error', 'attempts', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+        read_only_fields = fields
@@ -0,0 +1,7 @@
+from rest_framework import viewsets
+from .models import Job
+from .serializers import JobSerializer
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
@@ -0,0 +1,64 @@
+# Generated by Django 5.1 on 2026-10-17 19:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+RESERVATION_STATUS = {
+    'NEW': 'ACTIVE',
+    'PROCESSING': 'ACTIVE',
+    'SHIPPED': 'FULFILLED',
+    'DELIVERED': 'FULFILLED',
+    'CANCELLED': 'RELEASED',
+}
+
+
+def backfill_reservations(apps, schema_editor):
+    # Existing lines get a reservation matching their order's status, and Item.reserved
+    # the total held by open orders (which can exceed stock for orders taken before reservations)
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    StockReservation = apps.get_model('orders', 'StockReservation')
+    Item = apps.get_model('inventory', 'Item')
+
+    StockReservation.objects.bulk_create(
+        StockReservation(
+            order_item_id=order_item_id,
+            item_id=item_id,
+            quantity=quantity,
+            status=RESERVATION_STATUS.get(order_status, 'ACTIVE'),
+        )
+        for order_item_id, item_id, quantity, order_status in
+        OrderItem.objects.values_list('id', 'item_id', 'quantity', 'order__status').iterator()
+    )
+    held = StockReservation.objects.filter(item=OuterRef('pk'), status='ACTIVE').values('item').annotate(
+        total=Sum('quantity'),
+    ).values('total')
+    Item.objects.update(reserved=Coalesce(Subquery(held), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_item_reserved'),
+        ('orders', '0003_remove_order_total_amount_remove_orderitem_price_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('RELEASED', 'Released'), ('FULFILLED', 'Fulfilled')], default='ACTIVE', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='inventory.item')),
+                ('order_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reservation', to='orders.orderitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', 'status'], name='orders_stoc_item_id_23713c_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_reservations, migrations.RunPython.noop),
+    ]
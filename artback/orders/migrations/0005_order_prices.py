@@ -0,0 +1,51 @@
+# Generated by Django 5.1 on 2026-10-17 19:54
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_prices(apps, schema_editor):
+    # Lines written before prices were kept get the item's current price, the best one still known
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Order = apps.get_model('orders', 'Order')
+    Item = apps.get_model('inventory', 'Item')
+
+    price = Item.objects.filter(pk=OuterRef('item_id')).values('selling_price')
+    OrderItem.objects.update(unit_price=Coalesce(Subquery(price), 0))
+    OrderItem.objects.update(line_total=F('quantity') * F('unit_price'))
+    totals = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        total=Sum('line_total'),
+    ).values('total')
+    Order.objects.update(total_amount=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_staffmember_hire_date_alter_staffmember_role_and_more'),
+        ('orders', '0004_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date'], name='orders_orde_order_d_d71205_idx'),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
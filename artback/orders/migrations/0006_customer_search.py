@@ -0,0 +1,56 @@
+# Generated by Django 5.1 on 2026-10-17 19:57
+
+import core.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from orders.search import drop_search_triggers
+
+# As for the item index (inventory 0002): SQLite only, triggers installed after migrate
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE orders_customersearch USING fts5(name, email, phone, prefix='1 2 3')""",
+    # Rank by bm25 with name hits weighted above email and phone hits
+    """INSERT INTO orders_customersearch(orders_customersearch, rank) VALUES ('rank', 'bm25(10.0, 5.0, 5.0)')""",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_triggers(schema_editor.connection)
+        schema_editor.execute("DROP TABLE IF EXISTS orders_customersearch")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearch',
+            fields=[
+                ('customer', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='orders.customer')),
+                ('name', models.TextField()),
+                ('email', models.TextField()),
+                ('phone', models.TextField()),
+                ('document', core.search.SearchDocumentField(db_column='orders_customersearch')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'orders_customersearch',
+                'managed': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name'], name='orders_cust_name_1ee0b1_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-17 20:40
+
+from django.db import migrations
+
+from orders.search import drop_search_triggers
+
+
+def rebuild_customer_index(apps, schema_editor):
+    # Phones are now indexed as every suffix of their digits. Dropping the triggers makes
+    # OrdersConfig reinstall them and refill the index once migrate finishes.
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_triggers(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_customer_index, migrations.RunPython.noop),
+    ]
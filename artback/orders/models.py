@@ -1,7 +1,11 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from inventory.models import Item
+from inventory.services import release_stock
 from core.models import StaffMember
+from core.search import SearchDocumentField
 
 class Customer(models.Model):
     name = models.CharField(max_length=100)
@@ -9,8 +13,28 @@ class Customer(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.CharField(max_length=50, blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['name'])]
+
     def __str__(self):
         return self.name
+
+class CustomerSearch(models.Model):
+    """
+    Read-only view of the SQLite FTS5 index over customer name, email and
+    phone, kept current by the triggers in orders/search.py; other backends
+    search with icontains instead (see services.search_customers).
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search')
+    name = models.TextField()
+    email = models.TextField()
+    phone = models.TextField()
+    document = SearchDocumentField(db_column='orders_customersearch')
+    rank = models.FloatField()  # bm25 score of the current MATCH, lower is better
+
+    class Meta:
+        managed = False
+        db_table = 'orders_customersearch'
     
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -25,17 +49,65 @@ class Order(models.Model):
     employee = models.ForeignKey(StaffMember, on_delete=models.SET_NULL, null=True, blank=True, related_name='handled_orders')
     order_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='NEW')
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)  # Sum of line totals, kept by services
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Read by the sales report materializer
+
+    OPEN_STATUSES = ('NEW', 'PROCESSING')  # Lines hold reserved stock
+    SHIPPED_STATUSES = ('SHIPPED', 'DELIVERED')  # Reserved stock has left the inventory
+
+    class Meta:
+        indexes = [models.Index(fields=['order_date'])]
 
     def __str__(self):
         return f"{self.customer.name} - {self.order_date}"
 
+    @property
+    def is_open(self):
+        return self.status in self.OPEN_STATUSES
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # The item's selling price when the line was last written, so old orders keep their prices
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     notes = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=200, null=True, blank=True)
 
     def __str__(self):
         return f"{self.quantity} x {self.item.name} for Order #{self.order.id}"
     
+
+
+class StockReservation(models.Model):
+    """
+    Stock held for an order line. Item.reserved is the sum of an item's ACTIVE
+    reservations; cancelling the order releases them and shipping it turns
+    them into stock decrements (see services.set_order_status).
+    """
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('RELEASED', 'Released'),
+        ('FULFILLED', 'Fulfilled'),
+    ]
+
+    order_item = models.OneToOneField(OrderItem, on_delete=models.CASCADE, related_name='reservation')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['item', 'status'])]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item.name} for Order #{self.order_item.order_id} ({self.status})"
+
+
+# Deleting a line or a whole order, through any path, gives its held stock back
+@receiver(post_delete, sender=StockReservation)
+def release_deleted_reservation(sender, instance, **kwargs):
+    if instance.status == 'ACTIVE':
+        release_stock(instance.item, instance.quantity)
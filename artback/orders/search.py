@@ -0,0 +1,52 @@
+# orders/search.py
+"""
+Triggers that keep the orders_customersearch FTS5 table (migration 0006) in
+step with Customer; dropped around migrations and reinstalled afterwards as
+for the item index (see inventory/search.py and OrdersConfig.ready).
+
+Phone numbers are indexed with their separators stripped, as every suffix of
+their digits: +254 712 345 678 is stored as 254712345678 712345678 12345678 ...
+down to 8. A prefix query then matches any run of digits in the number, so a
+later group such as 345 678 finds it as well as the national form 0712 345
+(see services.customer_query).
+"""
+from core.search import drop_triggers, install_triggers
+
+PHONE_DIGITS = "replace(replace(replace(replace(replace(coalesce({0}, ''), ' ', ''), '-', ''), '+', ''), '(', ''), ')', '')"
+PHONE_MAX_DIGITS = 20  # Customer.phone is at most 20 characters
+PHONE_SUFFIXES = " || ' ' || ".join(
+    f'substr({PHONE_DIGITS}, {start})' for start in range(1, PHONE_MAX_DIGITS + 1)
+)
+
+TRIGGERS = {
+    'orders_customer_search_insert': f"""
+        CREATE TRIGGER orders_customer_search_insert AFTER INSERT ON orders_customer BEGIN
+            INSERT INTO orders_customersearch(rowid, name, email, phone)
+            VALUES (new.id, new.name, coalesce(new.email, ''), {PHONE_SUFFIXES.format('new.phone')});
+        END""",
+    'orders_customer_search_update': f"""
+        CREATE TRIGGER orders_customer_search_update AFTER UPDATE OF name, email, phone ON orders_customer BEGIN
+            UPDATE orders_customersearch
+            SET name = new.name, email = coalesce(new.email, ''), phone = {PHONE_SUFFIXES.format('new.phone')}
+            WHERE rowid = new.id;
+        END""",
+    'orders_customer_search_delete': """
+        CREATE TRIGGER orders_customer_search_delete AFTER DELETE ON orders_customer BEGIN
+            DELETE FROM orders_customersearch WHERE rowid = old.id;
+        END""",
+}
+
+REFILL_SQL = [
+    "DELETE FROM orders_customersearch",
+    f"""INSERT INTO orders_customersearch(rowid, name, email, phone)
+        SELECT id, name, coalesce(email, ''), {PHONE_SUFFIXES.format('phone')} FROM orders_customer""",
+]
+
+
+def drop_search_triggers(connection):
+    drop_triggers(connection, TRIGGERS)
+
+
+def install_search_triggers(connection):
+    """(Re)create the triggers and refill the index; does nothing until migration 0006 has created the table."""
+    install_triggers(connection, 'orders_customersearch', TRIGGERS, REFILL_SQL)
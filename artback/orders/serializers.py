@@ -1,9 +1,12 @@
+from django.db import transaction
 from rest_framework import serializers
+from . import services
 from .models import Customer, Order, OrderItem
 from inventory.models import Item
 from core.models import StaffMember
 from core.serializers import StaffMemberSerializer
 from inventory.serializers import ItemSerializer
+from inventory.services import InsufficientStock
 
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,10 +18,15 @@ class OrderSerializer(serializers.ModelSerializer):
     customer_id = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all(), write_only=True)
     employee = StaffMemberSerializer(read_only=True)
     employee_id = serializers.PrimaryKeyRelatedField(queryset=StaffMember.objects.all(), write_only=True, required=False, allow_null=True)
+    # Annotated by services.with_totals; left out of responses for orders read without it
+    line_count = serializers.IntegerField(read_only=True)
+    unit_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Order
-        fields = ['id', 'customer', 'customer_id', 'employee', 'employee_id', 'order_date', 'status']
+        fields = ['id', 'customer', 'customer_id', 'employee', 'employee_id', 'order_date', 'status',
+                  'line_count', 'unit_count', 'total_amount']
+        read_only_fields = ['total_amount']
 
     def create(self, validated_data):
         customer = validated_data.pop('customer_id')
@@ -27,10 +35,25 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         if 'customer_id' in validated_data:
-            instance.customer = validated_data.pop('customer_id')
+            validated_data['customer'] = validated_data.pop('customer_id')
         if 'employee_id' in validated_data:
-            instance.employee = validated_data.pop('employee_id')
-        return super().update(instance, validated_data)
+            validated_data['employee'] = validated_data.pop('employee_id')
+        new_status = validated_data.pop('status', None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        with transaction.atomic():
+            if validated_data:
+                # Only the fields sent are saved: total_amount moves by relative updates from the
+                # order service, and a full save would write this copy's stale figure over them
+                instance.save(update_fields=[*validated_data, 'updated_at'])
+            if new_status and new_status != instance.status:
+                # Status changes move reserved stock, so they go through the order service
+                try:
+                    services.set_order_status(instance, new_status)
+                except (InsufficientStock, services.OrderStateError) as e:
+                    raise serializers.ValidationError({'status': str(e)})
+        instance.refresh_from_db(fields=['total_amount'])
+        return instance
 
 class OrderItemSerializer(serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
@@ -40,14 +63,59 @@ class OrderItemSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = OrderItem
-        fields = ['id', 'order', 'order_id', 'item', 'item_id', 'quantity', 'notes', 'status']
+        fields = ['id', 'order', 'order_id', 'item', 'item_id', 'quantity', 'unit_price', 'line_total', 'notes', 'status']
+        read_only_fields = ['unit_price', 'line_total']
 
     def create(self, validated_data):
         order = validated_data.pop('order_id')
         item = validated_data.pop('item_id')
-        return OrderItem.objects.create(order=order, item=item, **validated_data)
+        try:
+            order_item = services.add_item(order, item, validated_data.pop('quantity', 1), validated_data.pop('notes', '') or '')
+        except (InsufficientStock, services.OrderStateError) as e:
+            raise serializers.ValidationError({'error': str(e)})
+        if validated_data:
+            order_item = super().update(order_item, validated_data)
+        return order_item
     
     def update(self, instance, validated_data):
-        if 'item_id' in validated_data:
-            instance.item = validated_data.pop('item_id')
-        return super().update(instance, validated_data)
\ No newline at end of file
+        validated_data.pop('order_id', None)  # Lines don't move between orders
+        item = validated_data.pop('item_id', None)
+        quantity = validated_data.pop('quantity', instance.quantity)
+        if item is not None or quantity != instance.quantity:
+            try:
+                services.update_item(instance, quantity, item=item)
+            except (InsufficientStock, services.OrderStateError) as e:
+                raise serializers.ValidationError({'error': str(e)})
+        return super().update(instance, validated_data)
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source='item.sku', read_only=True)
+    name = serializers.CharField(source='item.name', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'item_id', 'sku', 'name', 'quantity', 'unit_price', 'line_total', 'notes']
+
+class BulkOrderLineSerializer(serializers.Serializer):
+    # A plain id; the items of every line are read together in services.create_order
+    item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+class BulkOrderSerializer(serializers.Serializer):
+    customer_id = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all())
+    employee_id = serializers.PrimaryKeyRelatedField(queryset=StaffMember.objects.all(), required=False, allow_null=True)
+    lines = BulkOrderLineSerializer(many=True, allow_empty=False)
+
+class RevenuePeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
+    average_order_value = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class ItemRevenueSerializer(serializers.Serializer):
+    item_id = serializers.IntegerField(source='item')
+    sku = serializers.CharField(source='item__sku')
+    name = serializers.CharField(source='item__name')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
@@ -0,0 +1,251 @@
+# orders/services.py
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, DateField, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from core.search import fts_enabled, fts_query
+from inventory.models import Item
+from inventory.services import reserve_stock, reserve_stocks, release_stock, fulfil_reservation
+from .models import Order, OrderItem, StockReservation
+
+
+REVENUE_PERIODS = {'day': TruncDate, 'week': TruncWeek, 'month': TruncMonth}
+PHONE_LIKE = re.compile(r'[\d\s()+-]*\d[\d\s()+-]*')
+PHONE_MIN_DIGITS = 3  # Fewer match most of the index: every number holds every digit somewhere
+
+
+def customer_query(text):
+    """
+    fts_query for the customer index. Text that looks like a phone number
+    becomes a single prefix of its digits, with a leading 0 or the country
+    code dropped; phones are indexed as every suffix of their digits, so this
+    matches the number in its local or international form, or any later group.
+    Fewer than PHONE_MIN_DIGITS digits give an empty query.
+    """
+    if PHONE_LIKE.fullmatch(text.strip()):
+        digits = re.sub(r'\D', '', text)
+        for prefix in (settings.CUSTOMER_PHONE_COUNTRY_CODE, '0'):
+            if digits.startswith(prefix) and len(digits) > len(prefix):
+                digits = digits[len(prefix):]
+                break
+        return f'"{digits}"*' if len(digits) >= PHONE_MIN_DIGITS else ''
+    return fts_query(text)
+
+
+def search_customers(queryset, text):
+    """
+    Filter customers to those matching `text` in their name, email or phone,
+    best match first: each word as a prefix through the FTS5 index on SQLite,
+    icontains with the queryset's own ordering elsewhere.
+    """
+    if fts_enabled(connection):
+        query = customer_query(text)
+        if not query:
+            return queryset.none()
+        return queryset.filter(search__document__match=query).order_by('search__rank')
+    return queryset.filter(
+        Q(name__icontains=text) |
+        Q(email__icontains=text) |
+        Q(phone__icontains=text)
+    )
+
+
+def with_totals(queryset):
+    """
+    Annotate orders with their line and unit counts, counted by the database
+    over the order lines alone; the total amount is a column of its own.
+    """
+    return queryset.annotate(
+        line_count=Count('items'),
+        unit_count=Coalesce(Sum('items__quantity'), 0),
+    )
+
+
+def revenue_orders(start, end):
+    """Orders placed in [start, end) that count towards revenue, i.e. all but cancelled ones."""
+    return Order.objects.filter(order_date__gte=start, order_date__lt=end).exclude(status='CANCELLED')
+
+
+def revenue_by_period(start, end, period='day'):
+    """
+    Revenue, order count and average order value per day, week or month of
+    [start, end), summed from the stored order totals over the order_date index.
+    """
+    return revenue_orders(start, end).annotate(
+        period=REVENUE_PERIODS[period]('order_date', output_field=DateField()),
+    ).values('period').annotate(
+        orders=Count('id'),
+        revenue=Sum('total_amount'),
+        average_order_value=Avg('total_amount'),
+    ).order_by('period')
+
+
+def revenue_by_item(start, end):
+    """Units sold and revenue per item over the orders placed in [start, end), best sellers first."""
+    return OrderItem.objects.filter(order__in=revenue_orders(start, end).values('id')).values(
+        'item', 'item__sku', 'item__name',
+    ).annotate(
+        units=Sum('quantity'),
+        revenue=Sum('line_total'),
+    ).order_by('-revenue', 'item')
+
+
+def price_line(order_item):
+    """Snapshot the item's current selling price onto the line; returns the change in the line total."""
+    old_total = order_item.line_total
+    order_item.unit_price = order_item.item.selling_price
+    order_item.line_total = order_item.unit_price * order_item.quantity
+    return order_item.line_total - old_total
+
+
+def add_to_total(order, change):
+    # A relative UPDATE, so lines written concurrently on the same order all count
+    if change:
+        Order.objects.filter(pk=order.pk).update(total_amount=F('total_amount') + change, updated_at=timezone.now())
+        order.total_amount += change
+
+
+class OrderStateError(Exception):
+    """Raised when an order's lines can't be changed in its current status."""
+
+
+def add_item(order, item, quantity, notes=''):
+    """
+    Add a line to an open order at the item's current price, reserving its
+    stock; raises InsufficientStock if not enough is available.
+    """
+    if not order.is_open:
+        raise OrderStateError(f'Items can only be added to open orders, not {order.get_status_display().lower()} ones.')
+    with transaction.atomic():
+        reserve_stock(item, quantity)
+        order_item = OrderItem(order=order, item=item, quantity=quantity, notes=notes)
+        change = price_line(order_item)
+        order_item.save()
+        StockReservation.objects.create(order_item=order_item, item=item, quantity=quantity)
+        add_to_total(order, change)
+    return order_item
+
+
+def create_order(customer, lines, employee=None):
+    """
+    Create an order with all its lines at once; `lines` are dicts of item_id,
+    quantity and optional notes. Lines repeating an item are merged into one
+    order line, as every order holds at most one line per item.
+
+    One read of the items, the multi-row reservation of inventory's
+    reserve_stocks and one bulk insert each for the order lines and their
+    reservations, so the query count doesn't grow with the number of lines.
+    Nothing is written unless every line can be reserved. Returns the order,
+    annotated like with_totals, with its lines in `order.lines`.
+    """
+    quantities, notes = {}, {}
+    for line in lines:
+        quantities[line['item_id']] = quantities.get(line['item_id'], 0) + line['quantity']
+        notes.setdefault(line['item_id'], [])
+        if line.get('notes'):
+            notes[line['item_id']].append(line['notes'])
+
+    with transaction.atomic():
+        items = Item.objects.only('id', 'name', 'sku', 'selling_price').in_bulk(list(quantities))
+        missing = [item_id for item_id in quantities if item_id not in items]
+        if missing:
+            raise Item.DoesNotExist(f'Item with id {missing[0]} not found')
+        reserve_stocks(quantities)
+
+        order_items = [
+            OrderItem(item=items[item_id], quantity=quantity, notes='; '.join(notes[item_id]))
+            for item_id, quantity in quantities.items()
+        ]
+        for order_item in order_items:
+            price_line(order_item)
+        order = Order.objects.create(
+            customer=customer,
+            employee=employee,
+            total_amount=sum(order_item.line_total for order_item in order_items),
+        )
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+        StockReservation.objects.bulk_create(
+            StockReservation(order_item=order_item, item=order_item.item, quantity=order_item.quantity)
+            for order_item in order_items
+        )
+
+    order.lines = order_items
+    order.line_count = len(order_items)
+    order.unit_count = sum(quantities.values())
+    return order
+
+
+def update_item(order_item, quantity, notes=None, item=None):
+    """
+    Change a line's quantity (and optionally its item) on an open order,
+    reserving or releasing only the difference. The line is repriced at the
+    item's current selling price.
+    """
+    if not order_item.order.is_open:
+        raise OrderStateError('Only lines of open orders can be changed.')
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_related('item').get(order_item=order_item)
+        if item is not None and item.pk != reservation.item_id:
+            release_stock(reservation.item, reservation.quantity)
+            reserve_stock(item, quantity)
+            order_item.item = reservation.item = item
+        elif quantity > reservation.quantity:
+            reserve_stock(reservation.item, quantity - reservation.quantity)
+        else:
+            release_stock(reservation.item, reservation.quantity - quantity)
+
+        order_item.quantity = reservation.quantity = quantity
+        if notes is not None:
+            order_item.notes = notes
+        change = price_line(order_item)
+        order_item.save()
+        reservation.save(update_fields=['item', 'quantity', 'updated_at'])
+        add_to_total(order_item.order, change)
+    return order_item
+
+
+def remove_item(order_item):
+    if not order_item.order.is_open:
+        raise OrderStateError('Only lines of open orders can be removed.')
+    with transaction.atomic():
+        # The reservation's post_delete handler releases the stock
+        order_item.delete()
+        add_to_total(order_item.order, -order_item.line_total)
+
+
+def set_order_status(order, status):
+    """
+    Move an order to `status` and bring its reservations in line: open
+    orders hold stock, cancelled ones release it and shipped ones consume it.
+    Shipped orders can't be reopened or cancelled.
+    """
+    with transaction.atomic():
+        reservations = StockReservation.objects.select_related('item').filter(order_item__order=order)
+        if status in Order.SHIPPED_STATUSES:
+            for reservation in reservations.exclude(status='FULFILLED'):
+                if reservation.status == 'RELEASED':
+                    reserve_stock(reservation.item, reservation.quantity)
+                fulfil_reservation(reservation.item, reservation.quantity)
+                reservation.status = 'FULFILLED'
+                reservation.save(update_fields=['status', 'updated_at'])
+        else:
+            if reservations.filter(status='FULFILLED').exists():
+                raise OrderStateError('Shipped orders can not be reopened or cancelled.')
+            target = 'RELEASED' if status == 'CANCELLED' else 'ACTIVE'
+            for reservation in reservations.exclude(status=target):
+                if target == 'RELEASED':
+                    release_stock(reservation.item, reservation.quantity)
+                else:
+                    reserve_stock(reservation.item, reservation.quantity)
+                reservation.status = target
+                reservation.save(update_fields=['status', 'updated_at'])
+
+        order.status = status
+        order.save(update_fields=['status', 'updated_at'])
+    return order
@@ -1,3 +1,191 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from core.models import StaffMember
+from inventory.models import Category, Item
+from inventory.services import InsufficientStock
+from . import services
+from .models import Customer, Order, OrderItem, StockReservation
+from .serializers import OrderSerializer
+
+THREADS = 8
+ORDERS_PER_THREAD = 25
+LINES_PER_ORDER = 4
+
+
+def place_orders(customer_id, item_id, attempts, quantity):
+    # Runs in a pool thread; Django gives each thread its own connection
+    try:
+        item = Item.objects.get(pk=item_id)
+        placed = 0
+        for _ in range(attempts):
+            order = Order.objects.create(customer_id=customer_id)
+            try:
+                services.add_item(order, item, quantity)
+                placed += quantity
+            except InsufficientStock:
+                order.delete()
+        return placed
+    finally:
+        connection.close()
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Orders placed from many connections at once never reserve more than is in stock."""
+
+    def test_concurrent_orders_cannot_oversell(self):
+        category = Category.objects.create(name='Carvings')
+        # An odd stock against 2-unit orders leaves one unit no order can take
+        item = Item.objects.create(name='Giraffe', category=category, stock=101, selling_price=10)
+        customer = Customer.objects.create(name='Customer')
+
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            placed = sum(pool.map(lambda _: place_orders(customer.pk, item.pk, ORDERS_PER_THREAD, 2), range(THREADS)))
+
+        item.refresh_from_db()
+        held = StockReservation.objects.filter(item=item, status='ACTIVE').aggregate(total=Sum('quantity'))['total']
+        self.assertEqual(placed, 100)
+        self.assertEqual(item.reserved, placed)
+        self.assertEqual(held, placed)
+
+
+class OrderListQueryTests(TestCase):
+    """An order list page is one count and one page query, however many lines its orders have."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Carvings')
+        items = Item.objects.bulk_create(
+            Item(name=f'Item {n}', category=category, stock=100, selling_price=10 + n) for n in range(LINES_PER_ORDER)
+        )
+        cls.user = User.objects.create(username='clerk', first_name='Clerk')
+        employee, _ = StaffMember.objects.get_or_create(user=cls.user)
+        customers = Customer.objects.bulk_create(Customer(name=f'Customer {n}') for n in range(5))
+        orders = Order.objects.bulk_create(
+            Order(customer=customers[n % len(customers)], employee=employee if n % 2 else None,
+                  total_amount=sum(item.selling_price * (n % 3 + 1) for item in items))
+            for n in range(25)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, item=item, quantity=n % 3 + 1, unit_price=item.selling_price,
+                      line_total=item.selling_price * (n % 3 + 1))
+            for n, order in enumerate(orders) for item in items
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_pages(self):
+        for params in [{}, {'page': 2}, {'ordering': '-total_amount'}, {'ordering': 'unit_count', 'status': 'NEW'}]:
+            with self.subTest(**params):
+                with self.assertNumQueries(2):
+                    response = self.client.get('/api/orders/', params, secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), 10)
+                for order in response.data['results']:
+                    self.assertEqual(order['line_count'], LINES_PER_ORDER)
+
+    def test_list_totals(self):
+        response = self.client.get('/api/orders/', {'ordering': '-total_amount'}, secure=True)
+        totals = [Decimal(order['total_amount']) for order in response.data['results']]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        top = Order.objects.order_by('-total_amount', '-id').first()
+        self.assertEqual(response.data['results'][0]['unit_count'], top.items.aggregate(units=Sum('quantity'))['units'])
+
+
+class OrderUpdateTests(TestCase):
+    def test_edit_keeps_concurrent_total(self):
+        category = Category.objects.create(name='Carvings')
+        item = Item.objects.create(name='Giraffe', category=category, stock=10, selling_price=25)
+        order = Order.objects.create(customer=Customer.objects.create(name='First'))
+        stale = Order.objects.get(pk=order.pk)
+
+        # A line is added between the edit form loading the order and saving it
+        services.add_item(order, item, 2)
+        serializer = OrderSerializer(stale, data={'customer_id': Customer.objects.create(name='Second').pk}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        order.refresh_from_db()
+        self.assertEqual(order.customer.name, 'Second')
+        self.assertEqual(order.total_amount, Decimal('50.00'))
+        self.assertEqual(serializer.data['total_amount'], '50.00')
+
+
+class BulkOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Carvings')
+        cls.giraffe = Item.objects.create(name='Giraffe', category=category, stock=10, selling_price=25)
+        cls.lion = Item.objects.create(name='Lion', category=category, stock=10, selling_price=40)
+        cls.customer = Customer.objects.create(name='Customer')
+        cls.user = User.objects.create(username='clerk')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_items_become_one_line(self):
+        response = self.client.post('/api/orders/bulk/', {
+            'customer_id': self.customer.pk,
+            'lines': [
+                {'item_id': self.giraffe.pk, 'quantity': 2, 'notes': 'gift wrap'},
+                {'item_id': self.lion.pk, 'quantity': 1},
+                {'item_id': self.giraffe.pk, 'quantity': 3, 'notes': 'one painted blue'},
+            ],
+        }, format='json', secure=True)
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        line = order.items.get(item=self.giraffe)
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual((line.quantity, line.notes), (5, 'gift wrap; one painted blue'))
+        self.assertEqual(order.total_amount, Decimal('165.00'))
+        self.assertEqual(StockReservation.objects.get(order_item=line).quantity, 5)
+
+        # The merged line can be edited and removed by item like any other
+        response = self.client.post(f'/api/orders/{order.pk}/update_item/',
+                                    {'item_id': self.giraffe.pk, 'quantity': 4}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(f'/api/orders/{order.pk}/remove_item/',
+                                    {'item_id': self.giraffe.pk}, format='json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.giraffe.refresh_from_db()
+        self.assertEqual(self.giraffe.reserved, 0)
+
+
+class CustomerSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.amina = Customer.objects.create(name='Amina Wanjiru', phone='+254 712 345 678')
+        cls.baraka = Customer.objects.create(name='Baraka Otieno', phone='0798-111-222')
+        cls.user = User.objects.create(username='clerk')
+
+    def typeahead(self, text):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/customers/typeahead/', {'q': text}, secure=True)
+        return [customer['id'] for customer in response.data]
+
+    def test_phone_in_any_form(self):
+        for text, customer in [
+            ('+254 712 345', self.amina),
+            ('0712 345', self.amina),  # Local form of an international number
+            ('345 678', self.amina),  # A later group
+            ('+254 798 111', self.baraka),  # International form of a local number
+            ('111-222', self.baraka),
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(self.typeahead(text), [customer.pk])
+
+    def test_too_few_digits(self):
+        self.assertEqual(self.typeahead('7'), [])
+
+    def test_name(self):
+        self.assertEqual(self.typeahead('bar oti'), [self.baraka.pk])
@@ -1,100 +1,233 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import F, Sum
+from django.db.models import F
 from .models import Customer, Order, OrderItem
-from .serializers import CustomerSerializer, OrderItemSerializer, OrderSerializer
+from .serializers import (
+    CustomerSerializer, OrderItemSerializer, OrderSerializer, RevenuePeriodSerializer, ItemRevenueSerializer,
+    BulkOrderSerializer, OrderLineSerializer,
+)
 from inventory.models import Item
+from inventory.services import InsufficientStock, end_of_day
+from . import services
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+ORDER_ORDERING = {'id', 'order_date', 'status', 'line_count', 'unit_count', 'total_amount'}
+
+
+def date_range(params, required=False):
+    """Aware [start, end) datetimes for an inclusive ?from=/?to= YYYY-MM-DD range; open ends are None."""
+    if required and not (params.get('from') and params.get('to')):
+        raise ValidationError({'error': 'from and to dates are required.'})
+    try:
+        start = end = None
+        if params.get('from'):
+            first_day = datetime.strptime(params['from'], '%Y-%m-%d').date()
+            start = end_of_day(first_day - timedelta(days=1))
+        if params.get('to'):
+            last_day = datetime.strptime(params['to'], '%Y-%m-%d').date()
+            end = end_of_day(last_day)
+    except ValueError:
+        raise ValidationError({'error': 'Invalid date format. Use YYYY-MM-DD.'})
+    return start, end
 
 class CustomerViewSet(viewsets.ModelViewSet):
-    queryset = Customer.objects.all()
+    queryset = Customer.objects.all().order_by('name', 'id')
     serializer_class = CustomerSerializer
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        search_query = request.query_params.get('search', '')
+
+        if search_query:
+            queryset = services.search_customers(queryset, search_query)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        # The best ?limit= (default 10) customers matching ?q= by name, email or phone, unpaginated
+        text = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', TYPEAHEAD_LIMIT)), TYPEAHEAD_MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not text or limit < 1:
+            return Response([])
+
+        customers = services.search_customers(Customer.objects.all(), text)
+        return Response(list(customers.values('id', 'name', 'email', 'phone')[:limit]))
+
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all().order_by('-order_date')
     serializer_class = OrderSerializer
 
+    def get_queryset(self):
+        queryset = services.with_totals(super().get_queryset().select_related('customer', 'employee__user'))
+        if self.action != 'list':
+            return queryset
+
+        # List filters: ?status=, ?customer=<id>, an inclusive ?from=/?to= date range and ?min_total=/?max_total=
+        params = self.request.query_params
+        if params.get('status'):
+            if params['status'] not in dict(Order.STATUS_CHOICES):
+                raise ValidationError({'error': 'Invalid status.'})
+            queryset = queryset.filter(status=params['status'])
+        try:
+            if params.get('customer'):
+                queryset = queryset.filter(customer_id=int(params['customer']))
+        except ValueError:
+            raise ValidationError({'error': 'Invalid customer id.'})
+        start, end = date_range(params)
+        if start:
+            queryset = queryset.filter(order_date__gte=start)
+        if end:
+            queryset = queryset.filter(order_date__lt=end)
+        try:
+            if params.get('min_total'):
+                queryset = queryset.filter(total_amount__gte=Decimal(params['min_total']))
+            if params.get('max_total'):
+                queryset = queryset.filter(total_amount__lte=Decimal(params['max_total']))
+        except InvalidOperation:
+            raise ValidationError({'error': 'min_total and max_total must be numbers.'})
+
+        # ?ordering=<field> or -<field>
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering.lstrip('-') not in ORDER_ORDERING:
+                raise ValidationError({'error': f"ordering must be one of {', '.join(sorted(ORDER_ORDERING))}"})
+            queryset = queryset.order_by(ordering, '-id')
+        return queryset
+
     @action(detail=True, methods=['get'])
     def details(self, request, pk=None):
         order = self.get_object()
         order_items = OrderItem.objects.filter(order=order).annotate(
             sku=F('item__sku'),
             product_name=F('item__name'),
-            price=F('item__selling_price'),
-            subtotal=F('quantity') * F('item__selling_price')
+            price=F('item__selling_price'),  # Today's price, for comparison with the line's unit_price
         ).values(
-            'id', 'sku', 'product_name', 'quantity', 'price', 'subtotal', 'notes'
+            'id', 'sku', 'product_name', 'quantity', 'unit_price', 'line_total', 'price', 'notes'
         )
 
-        total_amount = sum(item['subtotal'] for item in order_items)
-
         response_data = {
             'order_id': order.id,
             'customer': order.customer.name,
             'date': order.order_date,
             'status': order.status,
-            'employee': order.employee.name if order.employee else None,
+            'employee': order.employee.user.get_full_name() if order.employee else None,
             'items': list(order_items),
-            'total_amount': total_amount
+            'line_count': order.line_count,
+            'unit_count': order.unit_count,
+            'total_amount': order.total_amount,
         }
 
         return Response(response_data)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        # A whole order in one request: {customer_id, employee_id?, lines: [{item_id, quantity, notes?}]}
+        serializer = BulkOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            order = services.create_order(data['customer_id'], data['lines'], data.get('employee_id'))
+        except (Item.DoesNotExist, InsufficientStock) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            **OrderSerializer(order).data,
+            'items': OrderLineSerializer(order.lines, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def revenue(self, request):
+        # Revenue per ?period=day|week|month between the required ?from= and ?to= dates; cancelled orders don't count
+        start, end = date_range(request.query_params, required=True)
+        period = request.query_params.get('period', 'day')
+        if period not in services.REVENUE_PERIODS:
+            return Response({'error': 'period must be day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(RevenuePeriodSerializer(services.revenue_by_period(start, end, period), many=True).data)
+
+    @action(detail=False, methods=['get'], url_path='revenue/items')
+    def item_revenue(self, request):
+        # Units and revenue per item between the required ?from= and ?to= dates
+        start, end = date_range(request.query_params, required=True)
+        return Response(ItemRevenueSerializer(services.revenue_by_item(start, end), many=True).data)
+
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
         order = self.get_object()
-        item_id = request.data['item_id']
-        quantity = int(request.data.get('quantity', 1))
+        item_id = request.data.get('item_id')
+        try:
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'Quantity must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({'error': 'Quantity must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             item = Item.objects.get(id=item_id)
-        except Item.DoesNotExist:
+        except (Item.DoesNotExist, ValueError, TypeError):
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        if item.stock < quantity:
-            return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        order_item = OrderItem.objects.create(
-            order=order,
-            item=item,
-            quantity=quantity,
-            notes=request.data.get('notes', '')
-        )
+
+        try:
+            services.add_item(order, item, quantity, request.data.get('notes', ''))
+        except (InsufficientStock, services.OrderStateError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': 'Item added to order successfully.'}, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
     def update_item(self, request, pk=None):
         order = self.get_object()
-        item_id = request.data['item_id']
-        quantity = int(request.data.get('quantity', 1))
+        item_id = request.data.get('item_id')
+        try:
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'Quantity must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({'error': 'Quantity must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
 
         try:
-            order_item = OrderItem.objects.get(order=order, item_id=item_id)
-        except OrderItem.DoesNotExist:
+            order_item = OrderItem.objects.select_related('order').get(order=order, item_id=item_id)
+        except (OrderItem.DoesNotExist, ValueError, TypeError):
             return Response({'error': 'Order item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        if quantity > order_item.item.stock + order_item.quantity:
-            return Response({'error': 'Insufficient stock'}, status=status.HTTP_400_BAD_REQUEST)
-
-        order_item.quantity = quantity
-        order_item.notes = notes
-        order_item.save()
+        try:
+            services.update_item(order_item, quantity, notes)
+        except (InsufficientStock, services.OrderStateError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': 'Order item updated successfully.'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def remove_item(self, request, pk=None):
         order = self.get_object()
-        item_id = request.data['item_id']
+        item_id = request.data.get('item_id')
 
         try:
-            order_item = OrderItem.objects.get(order=order, item_id=item_id)
-        except OrderItem.DoesNotExist:
+            order_item = OrderItem.objects.select_related('order').get(order=order, item_id=item_id)
+        except (OrderItem.DoesNotExist, ValueError, TypeError):
             return Response({'error': 'Order item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        order_item.delete()
+        try:
+            services.remove_item(order_item)
+        except services.OrderStateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': 'Item removed from order successfully.'}, status=status.HTTP_200_OK)
     
@@ -106,11 +239,19 @@ class OrderViewSet(viewsets.ModelViewSet):
         if new_status not in dict(Order.STATUS_CHOICES):
             return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.status = new_status
-        order.save()
+        try:
+            services.set_order_status(order, new_status)
+        except (InsufficientStock, services.OrderStateError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({'success': 'Order status updated successfully.', 'new_status': new_status})
     
 class OrderItemViewSet(viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
-    serializer_class = OrderItemSerializer
\ No newline at end of file
+    serializer_class = OrderItemSerializer
+
+    def perform_destroy(self, instance):
+        try:
+            services.remove_item(instance)
+        except services.OrderStateError as e:
+            raise ValidationError({'error': str(e)})
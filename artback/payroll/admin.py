@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import Payroll, AnnualBonus
+from .models import Payroll, PayrollPeriod, AnnualBonus, EarningsLedger, MonthlyRollup
 
 # Register your models here.
 
 admin.site.register(Payroll)
-admin.site.register(AnnualBonus)
\ No newline at end of file
+admin.site.register(AnnualBonus)
+admin.site.register(MonthlyRollup)
+admin.site.register(PayrollPeriod)
+@admin.register(EarningsLedger)
+class EarningsLedgerAdmin(admin.ModelAdmin):
+    list_display = ['artist', 'period', 'stage', 'item_qty', 'earnings']
+    list_filter = ['period', 'stage']
+    search_fields = ['artist__name']
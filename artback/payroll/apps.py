@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PayrollConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payroll'
+
+    def ready(self):
+        from . import jobs  # noqa: F401  Registers the payroll job handlers
@@ -0,0 +1,30 @@
+# payroll/jobs.py
+from datetime import date
+
+from jobs.registry import job_handler
+from . import services
+from .models import PayrollPeriod
+
+
+@job_handler('payroll.generate_monthly_payroll')
+def generate_monthly_payroll(job):
+    month = date.fromisoformat(job.payload['month'])
+    job.set_progress(5)
+    payrolls = services.generate_monthly_payroll(month, on_period=lambda done, total: job.set_progress(100 * done // total))
+    return {
+        'month': month.isoformat(),
+        'payroll_count': len(payrolls),
+        'total_earnings': str(sum(payroll.total_earnings for payroll in payrolls)),
+    }
+
+
+@job_handler('payroll.calculate_period')
+def calculate_period(job):
+    period = PayrollPeriod.objects.get(pk=job.payload['period_id'])
+    payrolls = services.calculate_period(period)
+    return {
+        'period_id': period.id,
+        'start_date': period.start_date.isoformat(),
+        'end_date': period.end_date.isoformat(),
+        'recalculated_artists': len(payrolls),
+    }
@@ -0,0 +1,82 @@
+# payroll/management/commands/benchmark_payroll.py
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from authentication.models import Artist
+from inventory.models import Category, Item
+from payroll import services
+from production.models import CompletedTask
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Time monthly payroll generation against synthetic CompletedTask volumes. '
+            'All data is created inside a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help='CompletedTask row counts to benchmark')
+        parser.add_argument('--artists', type=int, default=200)
+        parser.add_argument('--items', type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>10} {'payrolls':>9} {'queries':>8} {'seconds':>9}")
+        for rows in options['rows']:
+            try:
+                with transaction.atomic():
+                    result = self._run(rows, options['artists'], options['items'])
+                    raise Rollback
+            except Rollback:
+                pass
+            self.stdout.write(f"{rows:>10} {result['payrolls']:>9} {result['queries']:>8} {result['seconds']:>9.3f}")
+
+    def _run(self, rows, artist_count, item_count):
+        month = date(2000, 1, 1)
+        category = Category.objects.create(name='__benchmark__')
+        items = Item.objects.bulk_create(
+            Item(name=f'Item {i}', category=category, sku=f'~{i:08d}', selling_price=Decimal('100.00'),
+                 splitting_drawing_cost=Decimal('1.10'), carving_cutting_cost=Decimal('2.20'),
+                 sanding_cost=Decimal('3.30'), painting_cost=Decimal('4.40'),
+                 finishing_cost=Decimal('5.50'), packaging_cost=Decimal('6.60'))
+            for i in range(item_count)
+        )
+        artists = Artist.objects.bulk_create(
+            Artist(name=f'Artist {i}', phone_number='0') for i in range(artist_count)
+        )
+
+        start = timezone.make_aware(timezone.datetime(month.year, month.month, 1))
+        batch = []
+        for i in range(rows):
+            item, stage, accepted = items[i % item_count], str(1 + i % 6), 1 + i % 5
+            unit_rate = CompletedTask.stage_rate(item, stage)
+            batch.append(CompletedTask(
+                item=item,
+                artist=artists[i % artist_count],
+                accepted=accepted,
+                current_stage=stage,
+                date=start + timedelta(minutes=i % (28 * 24 * 60)),
+                unit_rate=unit_rate,
+                earnings=unit_rate * accepted,
+            ))
+            if len(batch) == 10_000:
+                CompletedTask.objects.bulk_create(batch)
+                batch = []
+        CompletedTask.objects.bulk_create(batch)
+
+        services.rebuild_ledger(month, month)
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            payrolls = services.generate_monthly_payroll(month)
+            seconds = time.perf_counter() - started
+
+        return {'payrolls': len(payrolls), 'queries': len(queries), 'seconds': seconds}
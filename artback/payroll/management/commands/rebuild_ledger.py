@@ -0,0 +1,46 @@
+# payroll/management/commands/rebuild_ledger.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll import services
+
+
+def parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Invalid month "{value}". Use YYYY-MM.')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the artist earnings ledger from CompletedTask rows and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_month', help='First month to check (YYYY-MM)')
+        parser.add_argument('--to', dest='last_month', help='Last month to check (YYYY-MM)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report drift; do not rewrite the ledger')
+
+    def handle(self, *args, **options):
+        first_month = parse_month(options['first_month']) if options['first_month'] else None
+        last_month = parse_month(options['last_month']) if options['last_month'] else None
+
+        expected, drift = services.ledger_drift(first_month, last_month)
+
+        for (artist_id, period, stage), (exp_qty, exp_earnings), (qty, earnings) in drift:
+            self.stdout.write(
+                f"artist={artist_id} period={period:%Y-%m} stage={stage} "
+                f"item_qty {qty} -> {exp_qty}, earnings {earnings} -> {exp_earnings}"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f'Ledger matches CompletedTask ({len(expected)} rows checked).'))
+            return
+
+        if options['verify']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} ledger rows drifted.'))
+            raise SystemExit(1)
+
+        rebuilt = services.rebuild_ledger(first_month, last_month, expected)
+        self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} drifted rows; ledger rebuilt with {rebuilt} rows.'))
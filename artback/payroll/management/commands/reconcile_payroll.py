@@ -0,0 +1,64 @@
+# payroll/management/commands/reconcile_payroll.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from payroll import services
+from .rebuild_ledger import parse_month
+
+
+def reconcile_month(month_iso):
+    # Runs in a pool process; each process opens its own database connection
+    return month_iso, services.reconcile_month(date.fromisoformat(month_iso))
+
+
+def months_between(first_month, last_month):
+    month = first_month
+    while month <= last_month:
+        yield month
+        month = month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+class Command(BaseCommand):
+    help = ('Check stored Payroll totals against CompletedTask (unit_rate x accepted), '
+            'one month per worker process, and print every mismatched (artist, period).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='first_month', required=True, help='First month (YYYY-MM)')
+        parser.add_argument('--to', dest='last_month', required=True, help='Last month (YYYY-MM)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        first_month = parse_month(options['first_month'])
+        last_month = parse_month(options['last_month'])
+        if first_month > last_month:
+            raise CommandError('--from must not be after --to.')
+
+        months = [month.isoformat() for month in months_between(first_month, last_month)]
+
+        # Forked workers must not share the parent's connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(options['workers'], len(months)),
+                                 mp_context=multiprocessing.get_context('fork')) as pool:
+            results = sorted(pool.map(reconcile_month, months))
+
+        periods_checked = 0
+        mismatch_count = 0
+        for month_iso, (periods, mismatches) in results:
+            periods_checked += periods
+            mismatch_count += len(mismatches)
+            for start_date, end_date, artist_id, (exp_qty, exp_earnings), (qty, earnings) in mismatches:
+                self.stdout.write(
+                    f"{start_date}..{end_date} artist={artist_id} "
+                    f"item_qty {qty} != {exp_qty}, total_earnings {earnings} != {exp_earnings}"
+                )
+
+        summary = f'{len(months)} months, {periods_checked} pay periods checked, {mismatch_count} mismatches.'
+        if mismatch_count:
+            self.stdout.write(self.style.WARNING(summary))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(summary))
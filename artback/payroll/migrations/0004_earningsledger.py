@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_artist_specialization'),
+        ('payroll', '0003_payroll_date_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EarningsLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('stage', models.CharField(choices=[('0', 'Ordered'), ('1', 'Splitting/drawing'), ('2', 'Carving/cutting'), ('3', 'Sanding'), ('4', 'Painting'), ('5', 'Finishing'), ('6', 'Packaging'), ('7', 'Done')], max_length=1)),
+                ('item_qty', models.IntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='earnings_ledger', to='authentication.artist')),
+            ],
+            options={
+                'ordering': ['-period', 'artist', 'stage'],
+                'unique_together': {('artist', 'period', 'stage')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Case, When, F, Sum
+from django.db.models.functions import TruncMonth
+
+STAGE_COST_FIELDS = {
+    '1': 'splitting_drawing_cost',
+    '2': 'carving_cutting_cost',
+    '3': 'sanding_cost',
+    '4': 'painting_cost',
+    '5': 'finishing_cost',
+    '6': 'packaging_cost',
+}
+
+
+def backfill_ledger(apps, schema_editor):
+    CompletedTask = apps.get_model('production', 'CompletedTask')
+    EarningsLedger = apps.get_model('payroll', 'EarningsLedger')
+
+    stage_cost = Case(
+        *[When(current_stage=stage, then=F('item__' + field)) for stage, field in STAGE_COST_FIELDS.items()],
+        default=F('item__splitting_drawing_cost'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+    rows = CompletedTask.objects.annotate(
+        period=TruncMonth('date', output_field=models.DateField()),
+    ).values('artist', 'period', 'current_stage').annotate(
+        item_qty=Sum('accepted'),
+        earnings=Sum(stage_cost * F('accepted'), output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+    ).order_by()
+
+    EarningsLedger.objects.bulk_create(
+        EarningsLedger(
+            artist_id=row['artist'],
+            period=row['period'],
+            stage=row['current_stage'],
+            item_qty=row['item_qty'],
+            earnings=Decimal(row['earnings'] or 0).quantize(Decimal('.01'), rounding=ROUND_HALF_UP),
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0004_earningsledger'),
+        ('production', '0008_alter_completedtask_date_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1 on 2026-10-17 19:26
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_qty(apps, schema_editor):
+    AnnualBonus = apps.get_model('payroll', 'AnnualBonus')
+    Payroll = apps.get_model('payroll', 'Payroll')
+    items = Payroll.objects.filter(
+        artist=OuterRef('artist'), month__year=OuterRef('year')
+    ).values('artist').annotate(total=Sum('item_qty')).values('total')
+    AnnualBonus.objects.update(item_qty=Coalesce(Subquery(items), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0005_backfill_earningsledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='annualbonus',
+            name='item_qty',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_item_qty, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1 on 2026-10-17 19:27
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollup(apps, schema_editor):
+    CompletedTask = apps.get_model('production', 'CompletedTask')
+    Payroll = apps.get_model('payroll', 'Payroll')
+    MonthlyRollup = apps.get_model('payroll', 'MonthlyRollup')
+
+    rollups = {}
+    tasks = CompletedTask.objects.annotate(
+        month=TruncMonth('date', output_field=models.DateField()),
+    ).values('month').annotate(total_completed=Sum('accepted'), total_tasks=Count('id')).order_by()
+    for row in tasks:
+        rollups[row['month']] = MonthlyRollup(
+            month=row['month'], total_completed=row['total_completed'], total_tasks=row['total_tasks'],
+        )
+    for row in Payroll.objects.values('month').annotate(total_earnings=Sum('total_earnings')).order_by():
+        rollups.setdefault(row['month'], MonthlyRollup(month=row['month'])).total_earnings = row['total_earnings']
+    MonthlyRollup.objects.bulk_create(rollups.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0006_annualbonus_item_qty'),
+        ('production', '0009_completedtask_unit_rate_earnings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('total_completed', models.IntegerField(default=0)),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('total_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1 on 2026-10-17 19:30
+
+from calendar import monthrange
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_monthly_periods(apps, schema_editor):
+    # Everything generated so far was monthly payroll: give each month a closed full-month period
+    Payroll = apps.get_model('payroll', 'Payroll')
+    PayrollPeriod = apps.get_model('payroll', 'PayrollPeriod')
+    for month in Payroll.objects.values_list('month', flat=True).distinct():
+        period = PayrollPeriod.objects.create(
+            start_date=month.replace(day=1),
+            end_date=month.replace(day=monthrange(month.year, month.month)[1]),
+            status='CLOSED',
+        )
+        Payroll.objects.filter(month=month).update(period=period)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_artist_specialization'),
+        ('payroll', '0007_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('CLOSED', 'Closed')], default='OPEN', max_length=10)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('last_calculated', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-start_date'],
+                'unique_together': {('start_date', 'end_date')},
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='payroll',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='period',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payrolls', to='payroll.payrollperiod'),
+        ),
+        migrations.RunPython(link_monthly_periods, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='payroll',
+            unique_together={('artist', 'period')},
+        ),
+    ]
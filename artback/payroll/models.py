@@ -1,7 +1,12 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from authentication.models import Artist
+from production.models import CompletedTask, CURRENT_STAGE_CHOICES
 
 class Payroll(models.Model):
     STATUS_CHOICES = [
@@ -10,6 +15,7 @@ class Payroll(models.Model):
     ]
 
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='payrolls')
+    period = models.ForeignKey('PayrollPeriod', on_delete=models.CASCADE, related_name='payrolls', null=True, blank=True)
     item_qty = models.PositiveIntegerField()
     total_earnings = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
@@ -17,11 +23,45 @@ class Payroll(models.Model):
     date_created = models.DateTimeField(default=timezone.now)  # New field to store the exact date and time of payroll creation
 
     class Meta:
-        unique_together = ['artist', 'month']  # Ensure only one payroll entry per artist per month
+        unique_together = ['artist', 'period']  # Ensure only one payroll entry per artist per pay period
         ordering = ['-month', 'artist']
 
     def __str__(self):
         return f"{self.artist.name} - {self.month.strftime('%B %Y')}"
+
+
+class PayrollPeriod(models.Model):
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('CLOSED', 'Closed'),
+    ]
+
+    start_date = models.DateField()
+    end_date = models.DateField()  # Inclusive
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    # CompletedTask rows updated after this have not been included yet; None means recalculate everyone
+    watermark = models.DateTimeField(null=True, blank=True)
+    last_calculated = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['start_date', 'end_date']
+        ordering = ['-start_date']
+
+    def __str__(self):
+        return f"{self.start_date.strftime('%d %b')} - {self.end_date.strftime('%d %b %Y')}"
+
+    @property
+    def month(self):
+        return self.start_date.replace(day=1)
+
+    @property
+    def is_full_month(self):
+        return self.start_date.day == 1 and (self.end_date + timedelta(days=1)).day == 1
+
+    @classmethod
+    def invalidate(cls, day):
+        """Force the next calculation of the open period covering `day` to recompute every artist."""
+        cls.objects.filter(start_date__lte=day, end_date__gte=day, status='OPEN').update(watermark=None)
     
 
 class AnnualBonus(models.Model):
@@ -33,6 +73,7 @@ class AnnualBonus(models.Model):
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='annual_bonuses')
     year = models.PositiveIntegerField()
     annual_earnings = models.DecimalField(max_digits=12, decimal_places=2)
+    item_qty = models.PositiveIntegerField(default=0)
     bonus_percentage = models.DecimalField(
         max_digits=5, 
         decimal_places=2,
@@ -54,4 +95,111 @@ class AnnualBonus(models.Model):
         # Calculate bonus amount before saving
         self.bonus_amount = (self.annual_earnings * self.bonus_percentage) / 100
         super().save(*args, **kwargs)
-    
+
+
+def increment_or_create(model, key, **amounts):
+    """Add `amounts` to the row identified by `key`, creating it on first use."""
+    increment = {field: F(field) + amount for field, amount in amounts.items()}
+    with transaction.atomic():
+        if model.objects.filter(**key).update(**increment):
+            return
+        try:
+            with transaction.atomic():
+                model.objects.create(**key, **amounts)
+        except IntegrityError:
+            # Created concurrently by another writer; fall back to incrementing it
+            model.objects.filter(**key).update(**increment)
+
+
+class EarningsLedger(models.Model):
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='earnings_ledger')
+    period = models.DateField()  # First day of the month the work was completed in
+    stage = models.CharField(max_length=1, choices=CURRENT_STAGE_CHOICES)
+    item_qty = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ['artist', 'period', 'stage']  # One running total per artist, month and stage
+        ordering = ['-period', 'artist', 'stage']
+
+    def __str__(self):
+        return f"{self.artist.name} - {self.period.strftime('%B %Y')} - Stage {self.stage}"
+
+    @classmethod
+    def post_task(cls, task, sign=1):
+        increment_or_create(
+            cls,
+            {'artist_id': task.artist_id, 'period': task_month(task), 'stage': task.current_stage},
+            item_qty=sign * task.accepted,
+            earnings=sign * task.earnings,
+        )
+
+
+class MonthlyRollup(models.Model):
+    month = models.DateField(unique=True)
+    total_completed = models.IntegerField(default=0)  # Units accepted across all CompletedTask rows
+    total_tasks = models.IntegerField(default=0)  # Number of CompletedTask rows
+    total_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Sum of Payroll.total_earnings
+
+    class Meta:
+        ordering = ['month']
+
+    def __str__(self):
+        return f"Rollup for {self.month.strftime('%B %Y')}"
+
+    @classmethod
+    def post_task(cls, task, sign=1):
+        increment_or_create(cls, {'month': task_month(task)}, total_completed=sign * task.accepted, total_tasks=sign)
+
+    @classmethod
+    def refresh_earnings(cls, month):
+        """Recompute the month's payroll total and upsert it in one statement."""
+        total = Payroll.objects.filter(month=month).aggregate(total=Sum('total_earnings'))['total'] or 0
+        cls.objects.bulk_create(
+            [cls(month=month, total_earnings=total)],
+            update_conflicts=True,
+            unique_fields=['month'],
+            update_fields=['total_earnings'],
+        )
+
+
+def task_day(task):
+    return timezone.localtime(task.date).date()
+
+
+def task_month(task):
+    return task_day(task).replace(day=1)
+
+
+# Keep the ledger and rollup in step with every CompletedTask write, whichever view or admin page made it
+@receiver(pre_save, sender=CompletedTask)
+def remember_ledger_entry(sender, instance, **kwargs):
+    if instance.pk:
+        previous = instance._ledger_previous = CompletedTask.objects.filter(pk=instance.pk).first()
+        if previous is not None and (previous.current_stage, previous.item_id) != (instance.current_stage, instance.item_id):
+            # Work moved to another stage or item is paid at that stage's rate, not the one snapshotted before
+            instance.price(snapshot=True)
+
+@receiver(post_save, sender=CompletedTask)
+def post_ledger_entry(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous is not None:
+        EarningsLedger.post_task(previous, sign=-1)
+        MonthlyRollup.post_task(previous, sign=-1)
+        if previous.date != instance.date:
+            # The row moved out of its old pay period, which the watermark can't see
+            PayrollPeriod.invalidate(task_day(previous))
+    EarningsLedger.post_task(instance)
+    MonthlyRollup.post_task(instance)
+
+@receiver(post_delete, sender=CompletedTask)
+def reverse_ledger_entry(sender, instance, **kwargs):
+    EarningsLedger.post_task(instance, sign=-1)
+    MonthlyRollup.post_task(instance, sign=-1)
+    PayrollPeriod.invalidate(task_day(instance))
+
+# Bulk payroll generation refreshes the rollup itself; these cover edits made one row at a time
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def refresh_rollup_earnings(sender, instance, **kwargs):
+    MonthlyRollup.refresh_earnings(instance.month)
@@ -1,10 +1,18 @@
 from rest_framework import serializers
-from .models import Payroll
+from .models import Payroll, PayrollPeriod
 
 class PayrollSerializer(serializers.ModelSerializer):
     artist_name = serializers.CharField(source='artist.name', read_only=True)
+    period_start = serializers.DateField(source='period.start_date', read_only=True, default=None)
+    period_end = serializers.DateField(source='period.end_date', read_only=True, default=None)
 
     class Meta:
         model = Payroll
-        fields = ['id', 'artist', 'artist_name', 'item_qty', 'total_earnings', 'status', 'month']
-        read_only_fields = ['id', 'artist_name', 'month']
\ No newline at end of file
+        fields = ['id', 'artist', 'artist_name', 'item_qty', 'total_earnings', 'status', 'month', 'period', 'period_start', 'period_end']
+        read_only_fields = ['id', 'artist_name', 'month', 'period', 'period_start', 'period_end']
+
+class PayrollPeriodSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PayrollPeriod
+        fields = ['id', 'start_date', 'end_date', 'status', 'watermark', 'last_calculated']
+        read_only_fields = fields
\ No newline at end of file
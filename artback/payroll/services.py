@@ -0,0 +1,335 @@
+# payroll/services.py
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Payroll, PayrollPeriod, AnnualBonus, EarningsLedger, MonthlyRollup
+from production.models import CompletedTask
+
+CENTS = Decimal('.01')
+WATERMARK_GRACE = timedelta(minutes=1)
+EXPORT_CHUNK_SIZE = 2000
+
+
+def date_bounds(start_date, end_date):
+    """Return aware [start, end) datetimes covering the dates start_date..end_date inclusive."""
+    tz = timezone.get_current_timezone()
+    return (timezone.make_aware(datetime.combine(start_date, time.min), tz),
+            timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz))
+
+
+def month_bounds(month):
+    """Return aware [start, end) datetimes covering the month of `month`."""
+    start = month.replace(day=1)
+    return date_bounds(start, start.replace(day=monthrange(start.year, start.month)[1]))
+
+
+def period_bounds(day):
+    """(start_date, end_date) of the pay period containing `day`, per settings.PAYROLL_PERIOD_START_DAYS."""
+    days_in_month = monthrange(day.year, day.month)[1]
+    start_days = sorted({1, *(d for d in settings.PAYROLL_PERIOD_START_DAYS if d <= days_in_month)})
+    start_day = max(d for d in start_days if d <= day.day)
+    later = [d for d in start_days if d > start_day]
+    return day.replace(day=start_day), day.replace(day=later[0] - 1 if later else days_in_month)
+
+
+def periods_in_month(month):
+    day = month.replace(day=1)
+    while day.month == month.month:
+        start_date, end_date = period_bounds(day)
+        yield start_date, end_date
+        day = end_date + timedelta(days=1)
+
+
+def month_closed(month):
+    """True once every pay period of `month` exists and is CLOSED."""
+    spans = list(periods_in_month(month))
+    closed = PayrollPeriod.objects.filter(
+        start_date__range=(spans[0][0], spans[-1][1]), status='CLOSED',
+    ).values_list('start_date', 'end_date')
+    return set(spans) <= set(closed)
+
+
+def get_period(day):
+    start_date, end_date = period_bounds(day)
+    period, _ = PayrollPeriod.objects.get_or_create(start_date=start_date, end_date=end_date)
+    return period
+
+
+def ledger_earnings(month):
+    """Per-artist totals for a month, summed from the artist's ledger rows (one per stage)."""
+    return EarningsLedger.objects.filter(period=month).values('artist').annotate(
+        item_qty=Sum('item_qty'),
+        total_earnings=Sum('earnings'),
+    ).order_by('artist')
+
+
+def raw_ledger_totals(first_month=None, last_month=None):
+    """Recompute ledger rows from CompletedTask: {(artist_id, period, stage): (item_qty, earnings)}."""
+    tasks = CompletedTask.objects.all()
+    if first_month:
+        tasks = tasks.filter(date__gte=month_bounds(first_month)[0])
+    if last_month:
+        tasks = tasks.filter(date__lt=month_bounds(last_month)[1])
+    rows = tasks.annotate(
+        period=TruncMonth('date', output_field=models.DateField()),
+    ).values('artist', 'period', 'current_stage').annotate(
+        item_qty=Sum('accepted'),
+        earnings=Sum('earnings'),
+    ).order_by()
+    return {
+        (row['artist'], row['period'], row['current_stage']):
+            (row['item_qty'], Decimal(row['earnings'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP))
+        for row in rows
+    }
+
+
+def ledger_rows(first_month=None, last_month=None):
+    rows = EarningsLedger.objects.all()
+    if first_month:
+        rows = rows.filter(period__gte=first_month)
+    if last_month:
+        rows = rows.filter(period__lte=last_month)
+    return rows
+
+
+def ledger_drift(first_month=None, last_month=None):
+    """
+    Compare the ledger with totals recomputed from CompletedTask.
+
+    Returns (expected, drift) where drift is a sorted list of
+    (key, expected, actual) tuples for every key whose totals differ.
+    """
+    expected = raw_ledger_totals(first_month, last_month)
+    actual = {
+        (row.artist_id, row.period, row.stage): (row.item_qty, row.earnings)
+        for row in ledger_rows(first_month, last_month)
+    }
+    zero = (0, Decimal('0.00'))
+    drift = [
+        (key, expected.get(key, zero), actual.get(key, zero))
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key, zero) != actual.get(key, zero)
+    ]
+    return expected, drift
+
+
+def rebuild_ledger(first_month=None, last_month=None, expected=None):
+    """Replace the ledger rows for the given months with totals recomputed from CompletedTask."""
+    if expected is None:
+        expected = raw_ledger_totals(first_month, last_month)
+    with transaction.atomic():
+        ledger_rows(first_month, last_month).delete()
+        EarningsLedger.objects.bulk_create(
+            EarningsLedger(artist_id=artist_id, period=period, stage=stage, item_qty=item_qty, earnings=earnings)
+            for (artist_id, period, stage), (item_qty, earnings) in expected.items()
+        )
+    return len(expected)
+
+
+def period_totals(tasks):
+    return tasks.values('artist').annotate(
+        item_qty=Sum('accepted'),
+        total_earnings=Sum('earnings'),
+    ).order_by('artist')
+
+
+def calculate_period(period):
+    """
+    Bring the Payroll rows of an open pay period up to date.
+
+    The first run includes every artist. Later runs only recompute artists
+    with CompletedTask rows written since the period's watermark, so the
+    cost follows the activity since the last run rather than the period
+    length. Returns the Payroll rows that were written.
+    """
+    if period.status == 'CLOSED':
+        raise ValueError(f'Pay period {period} is closed.')
+
+    start, end = date_bounds(period.start_date, period.end_date)
+    tasks = CompletedTask.objects.filter(date__gte=start, date__lt=end)
+
+    with transaction.atomic():
+        run_started = timezone.now()
+        full_run = period.watermark is None
+        if full_run and period.is_full_month:
+            totals = ledger_earnings(period.month)
+        elif full_run:
+            totals = period_totals(tasks)
+        else:
+            # The grace window re-reads rows stamped just before the last run but committed after it
+            changed = tasks.filter(updated_at__gt=period.watermark - WATERMARK_GRACE).values('artist')
+            totals = period_totals(tasks.filter(artist__in=changed))
+
+        # Rows already paid out are settled; recalculation never rewrites them
+        paid = set(Payroll.objects.filter(period=period, status='PAID').values_list('artist_id', flat=True))
+        payrolls = [
+            Payroll(
+                artist_id=row['artist'],
+                period=period,
+                item_qty=max(row['item_qty'] or 0, 0),
+                total_earnings=Decimal(row['total_earnings'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP),
+                month=period.month,
+            )
+            for row in totals
+            if row['artist'] not in paid
+        ]
+        Payroll.objects.bulk_create(
+            payrolls,
+            update_conflicts=True,
+            unique_fields=['artist', 'period'],
+            update_fields=['item_qty', 'total_earnings'],
+        )
+        if full_run:
+            # Artists whose rows were all deleted or moved since an earlier run
+            Payroll.objects.filter(period=period).exclude(status='PAID').exclude(
+                artist_id__in=[payroll.artist_id for payroll in payrolls]
+            ).update(item_qty=0, total_earnings=0)
+
+        period.watermark = period.last_calculated = run_started
+        period.save(update_fields=['watermark', 'last_calculated'])
+        MonthlyRollup.refresh_earnings(period.month)
+
+    return payrolls
+
+
+def generate_monthly_payroll(payroll_date, on_period=None):
+    """
+    Calculate every open pay period in the month of `payroll_date`; returns the Payroll rows written.
+    on_period(done, total) is called after each period, e.g. to report a job's progress.
+    """
+    spans = list(periods_in_month(payroll_date))
+    payrolls = []
+    for done, (start_date, end_date) in enumerate(spans, 1):
+        period, _ = PayrollPeriod.objects.get_or_create(start_date=start_date, end_date=end_date)
+        if period.status == 'OPEN':
+            payrolls.extend(calculate_period(period))
+        if on_period:
+            on_period(done, len(spans))
+    return payrolls
+
+
+def reconcile_month(month):
+    """
+    Check the stored Payroll rows of every pay period starting in `month`
+    against CompletedTask, recomputing earnings as unit_rate * accepted.
+
+    Returns (periods_checked, mismatches); each mismatch is
+    (period_start, period_end, artist_id, (item_qty, earnings) expected, (item_qty, earnings) stored).
+    """
+    start_date, end_date = month.replace(day=1), month.replace(day=monthrange(month.year, month.month)[1])
+    periods = PayrollPeriod.objects.filter(start_date__range=[start_date, end_date]).order_by('start_date')
+
+    zero = (0, Decimal('0.00'))
+    mismatches = []
+    for period in periods:
+        start, end = date_bounds(period.start_date, period.end_date)
+        expected = {
+            row['artist']: (row['item_qty'], Decimal(row['earnings'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP))
+            for row in CompletedTask.objects.filter(date__gte=start, date__lt=end).values('artist').annotate(
+                item_qty=Sum('accepted'),
+                earnings=Sum(F('unit_rate') * F('accepted'), output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+            ).order_by()
+        }
+        stored = {
+            artist_id: (item_qty, total_earnings)
+            for artist_id, item_qty, total_earnings in
+            Payroll.objects.filter(period=period).values_list('artist', 'item_qty', 'total_earnings')
+        }
+        mismatches.extend(
+            (period.start_date, period.end_date, artist_id, expected.get(artist_id, zero), stored.get(artist_id, zero))
+            for artist_id in sorted(expected.keys() | stored.keys())
+            if expected.get(artist_id, zero) != stored.get(artist_id, zero)
+        )
+
+    return len(periods), mismatches
+
+
+def export_rows(periods):
+    """
+    Yield one dict per Payroll row of each period, with its per-stage breakdown.
+
+    Payroll rows and the CompletedTask stage totals are both streamed in
+    artist order with server-side iterators and merged as they arrive, so
+    memory stays flat however many rows a period has.
+    """
+    for period in periods:
+        start, end = date_bounds(period.start_date, period.end_date)
+        payrolls = Payroll.objects.filter(period=period).select_related('artist').order_by('artist_id')
+        stage_totals = CompletedTask.objects.filter(date__gte=start, date__lt=end).values(
+            'artist', 'current_stage'
+        ).annotate(
+            item_qty=Sum('accepted'),
+            earnings=Sum('earnings'),
+        ).order_by('artist', 'current_stage').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        stage_row = next(stage_totals, None)
+        for payroll in payrolls.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            while stage_row is not None and stage_row['artist'] < payroll.artist_id:
+                stage_row = next(stage_totals, None)
+            stages = {}
+            while stage_row is not None and stage_row['artist'] == payroll.artist_id:
+                stages[stage_row['current_stage']] = {
+                    'item_qty': stage_row['item_qty'],
+                    'earnings': Decimal(stage_row['earnings'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP),
+                }
+                stage_row = next(stage_totals, None)
+
+            yield {
+                'payroll_id': payroll.id,
+                'artist_id': payroll.artist_id,
+                'artist_name': payroll.artist.name,
+                'period_start': period.start_date,
+                'period_end': period.end_date,
+                'item_qty': payroll.item_qty,
+                'total_earnings': payroll.total_earnings,
+                'status': payroll.status,
+                'stages': stages,
+            }
+
+
+def generate_annual_bonuses(year, bonus_percentage):
+    """
+    Compute every artist's bonus for `year` from their payrolls.
+
+    One grouped aggregate over Payroll, then one bulk insert-or-update of
+    the AnnualBonus rows. Bonuses already paid out are left as they are.
+    """
+    annual_stats = Payroll.objects.filter(
+        month__range=[date(year, 1, 1), date(year, 12, 31)]
+    ).values('artist').annotate(
+        total_earnings=Sum('total_earnings'),
+        total_items=Sum('item_qty'),
+    ).order_by('artist')
+
+    bonuses = []
+    for stat in annual_stats:
+        annual_earnings = Decimal(stat['total_earnings'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP)
+        bonus_amount = (annual_earnings * bonus_percentage / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+        bonuses.append(AnnualBonus(
+            artist_id=stat['artist'],
+            year=year,
+            annual_earnings=annual_earnings,
+            item_qty=stat['total_items'] or 0,
+            bonus_percentage=bonus_percentage,
+            bonus_amount=max(bonus_amount, Decimal('0.00')),
+        ))
+
+    with transaction.atomic():
+        # A paid bonus is settled; regenerating the year never rewrites it
+        paid = set(AnnualBonus.objects.filter(year=year, status='PAID').values_list('artist_id', flat=True))
+        bonuses = [bonus for bonus in bonuses if bonus.artist_id not in paid]
+        AnnualBonus.objects.bulk_create(
+            bonuses,
+            update_conflicts=True,
+            unique_fields=['artist', 'year'],
+            update_fields=['annual_earnings', 'item_qty', 'bonus_percentage', 'bonus_amount', 'updated_at'],
+        )
+
+    return bonuses
@@ -1,3 +1,144 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
+from math import ceil
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from authentication.models import Artist
+from inventory.models import Category, Item
+from production.models import CompletedTask
+from . import services
+from .models import AnnualBonus, Payroll, PayrollPeriod
+
+ARTIST_COUNTS = [10, 100, 1000]
+
+
+def insert_batches(model, rows):
+    """INSERT statements bulk_create needs for `rows` objects under the backend's parameter limit."""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    return ceil(rows / connection.ops.bulk_batch_size(fields, [None] * rows))
+
+
+class AnnualBonusQueryTests(TestCase):
+    """Bonus generation and the annual stats read stay at a fixed number of queries however many artists there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='manager')
+        # Each size gets its own year, so the queries for one never see the artists of another
+        for year, count in zip(range(2020, 2020 + len(ARTIST_COUNTS)), ARTIST_COUNTS):
+            artists = Artist.objects.bulk_create(
+                Artist(name=f'Artist {year}-{n}', phone_number=str(n)) for n in range(count)
+            )
+            Payroll.objects.bulk_create(
+                Payroll(artist=artist, item_qty=n % 7 + 1, total_earnings=Decimal('100.00') + n,
+                        status='PAID', month=date(year, month, 1))
+                for n, artist in enumerate(artists) for month in (3, 9)
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_generate_bonuses(self):
+        for year, count in zip(range(2020, 2020 + len(ARTIST_COUNTS)), ARTIST_COUNTS):
+            with self.subTest(artists=count):
+                # The grouped read over Payroll, then the paid bonuses read and the upsert batches inside a savepoint
+                with self.assertNumQueries(1 + 2 + 1 + insert_batches(AnnualBonus, count)):
+                    response = self.client.post('/api/payroll/generate_bonuses/',
+                                                {'year': year, 'percentage': '10'}, format='json', secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['bonus_count'], count)
+                self.assertEqual(AnnualBonus.objects.filter(year=year).count(), count)
+
+    def test_generate_bonuses_again_updates_in_place(self):
+        self.client.post('/api/payroll/generate_bonuses/', {'year': 2020, 'percentage': '10'}, format='json', secure=True)
+        self.client.post('/api/payroll/generate_bonuses/', {'year': 2020, 'percentage': '20'}, format='json', secure=True)
+        bonus = AnnualBonus.objects.get(year=2020, artist__name='Artist 2020-0')
+        self.assertEqual(AnnualBonus.objects.filter(year=2020).count(), 10)
+        self.assertEqual(bonus.annual_earnings, Decimal('200.00'))
+        self.assertEqual(bonus.bonus_amount, Decimal('40.00'))
+
+    def test_generate_bonuses_again_leaves_paid_bonuses_alone(self):
+        artist = Artist.objects.get(name='Artist 2020-0')
+        self.client.post('/api/payroll/generate_bonuses/', {'year': 2020, 'percentage': '10'}, format='json', secure=True)
+        self.client.post('/api/payroll/pay_bonuses/', {'year': 2020, 'artist_ids': [artist.pk]}, format='json', secure=True)
+
+        response = self.client.post('/api/payroll/generate_bonuses/', {'year': 2020, 'percentage': '20'},
+                                    format='json', secure=True)
+        self.assertEqual(response.data['bonus_count'], 9)
+        paid = AnnualBonus.objects.get(year=2020, artist=artist)
+        self.assertEqual((paid.status, paid.bonus_amount), ('PAID', Decimal('20.00')))
+        self.assertEqual(AnnualBonus.objects.get(year=2020, artist__name='Artist 2020-1').bonus_percentage, Decimal('20.00'))
+
+    def test_annual_artist_stats(self):
+        for year, count in zip(range(2020, 2020 + len(ARTIST_COUNTS)), ARTIST_COUNTS):
+            self.client.post('/api/payroll/generate_bonuses/', {'year': year, 'percentage': '10'}, format='json', secure=True)
+            with self.subTest(artists=count):
+                with self.assertNumQueries(1):
+                    response = self.client.get('/api/payroll/annual_artist_stats/', {'year': year}, secure=True)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), count)
+
+
+@override_settings(PAYROLL_PERIOD_START_DAYS=[1])
+class MonthlyPayrollTests(TestCase):
+    month = date(2025, 3, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Carvings')
+        cls.item = Item.objects.create(name='Giraffe', category=category, selling_price=50, sanding_cost=2)
+        cls.artists = [Artist.objects.create(name=f'Artist {n}', phone_number=str(n)) for n in range(2)]
+
+    def work(self, artist, accepted, day=10):
+        when = timezone.make_aware(datetime(2025, 3, day, 12))
+        CompletedTask.objects.create(item=self.item, artist=artist, accepted=accepted, current_stage='3', date=when)
+
+    def test_one_payroll_per_artist_per_month(self):
+        for artist in self.artists:
+            self.work(artist, 5, day=3)
+            self.work(artist, 5, day=20)
+        services.generate_monthly_payroll(self.month)
+        self.assertEqual(Payroll.objects.filter(month=self.month).count(), len(self.artists))
+        self.assertEqual(Payroll.objects.get(artist=self.artists[0]).total_earnings, Decimal('20.00'))
+
+    def test_recalculation_leaves_paid_rows_alone(self):
+        paid, pending = self.artists
+        self.work(paid, 5)
+        self.work(pending, 5)
+        services.generate_monthly_payroll(self.month)
+        Payroll.objects.filter(artist=paid).update(status='PAID')
+
+        self.work(paid, 3)
+        self.work(pending, 3)
+        services.generate_monthly_payroll(self.month)
+        self.assertEqual(Payroll.objects.get(artist=paid).total_earnings, Decimal('10.00'))
+        self.assertEqual(Payroll.objects.get(artist=pending).total_earnings, Decimal('16.00'))
+
+    def test_closed_periods_are_skipped(self):
+        self.work(self.artists[0], 5)
+        services.generate_monthly_payroll(self.month)
+        PayrollPeriod.objects.update(status='CLOSED')
+
+        self.work(self.artists[0], 3)
+        self.assertEqual(services.generate_monthly_payroll(self.month), [])
+        self.assertEqual(Payroll.objects.get(artist=self.artists[0]).total_earnings, Decimal('10.00'))
+
+    def test_generate_endpoint_refuses_only_closed_months(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='manager'))
+        self.work(self.artists[0], 5)
+        services.generate_monthly_payroll(self.month)
+
+        # Partly calculated: regenerating is allowed
+        response = client.post('/api/payroll/generate_monthly_payroll/', {'month': '2025-03'}, format='json', secure=True)
+        self.assertEqual(response.status_code, 202)
+
+        PayrollPeriod.objects.update(status='CLOSED')
+        response = client.post('/api/payroll/generate_monthly_payroll/', {'month': '2025-03'}, format='json', secure=True)
+        self.assertEqual(response.status_code, 400)
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PayrollViewSet
+from .views import PayrollViewSet, PayrollPeriodViewSet
 
 router = DefaultRouter()
 router.register(r'payroll', PayrollViewSet)
+router.register(r'payroll-periods', PayrollPeriodViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,29 +1,71 @@
 # payroll/views.py
+import csv
+import json
 import logging
-from calendar import monthrange
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 
-from django.db import transaction, IntegrityError
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncMonth
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Q
 from django.utils import timezone
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.reverse import reverse
 
-from .models import Payroll, AnnualBonus
-from .serializers import PayrollSerializer
-from production.models import CompletedTask
-from authentication.models import Artist
+from . import services
+from .models import Payroll, PayrollPeriod, AnnualBonus, MonthlyRollup
+from .serializers import PayrollSerializer, PayrollPeriodSerializer
+from production.models import CURRENT_STAGE_CHOICES
+from jobs.registry import enqueue_once
 from .permissions import IsManagerOrProprietor
 
 logger = logging.getLogger(__name__)
 
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    stages = [(code, label) for code, label in CURRENT_STAGE_CHOICES]
+    writer = csv.writer(Echo())
+    # The header goes out before the queries run
+    yield writer.writerow(
+        ['artist_id', 'artist_name', 'period_start', 'period_end', 'item_qty', 'total_earnings', 'status']
+        + [f'{label} {column}' for code, label in stages for column in ('qty', 'earnings')]
+    )
+    for row in rows:
+        breakdown = []
+        for code, label in stages:
+            stage = row['stages'].get(code, {'item_qty': 0, 'earnings': Decimal('0.00')})
+            breakdown += [stage['item_qty'], stage['earnings']]
+        yield writer.writerow(
+            [row['artist_id'], row['artist_name'], row['period_start'], row['period_end'],
+             row['item_qty'], row['total_earnings'], row['status']] + breakdown
+        )
+
+
+def export_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def job_accepted(job, request):
+    return Response({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('job-detail', args=[job.id], request=request),
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 class PayrollViewSet(viewsets.ModelViewSet):
-    queryset = Payroll.objects.all()
+    queryset = Payroll.objects.select_related('artist', 'period')
     serializer_class = PayrollSerializer
     # permission_classes = [IsAuthenticated]
 
@@ -32,98 +74,6 @@ class PayrollViewSet(viewsets.ModelViewSet):
     #         return [IsAuthenticated(), IsManagerOrProprietor()]
     #     return super().get_permissions()
 
-    # @action(detail=False, methods=['post'])
-    # def generate_monthly_payroll(self, request):
-    #     current_date = timezone.now().date()
-    #     current_month_start = current_date.replace(day=1)
-
-    #     # Check the latest payroll record
-    #     latest_payroll = Payroll.objects.filter(date_created__gte=current_month_start).order_by('-date_created').first()
-    #     print(latest_payroll)
-    #     day = 14
-    #     # day = current_date.day
-
-    #     if latest_payroll:
-    #         # If there's a payroll record this month
-    #         days_since_last_payroll = (current_date - latest_payroll.date_created.date()).days
-    #         if days_since_last_payroll < 10:
-    #             return Response({'error': 'Cannot generate payroll within 10 days of the last payroll.'}, status=status.HTTP_400_BAD_REQUEST)
-    #         if day < 24:
-    #             return Response({'error': 'Cannot generate second payroll of the month before the 24th.'}, status=status.HTTP_400_BAD_REQUEST)
-            
-    #         x = min(max(latest_payroll.date_created.day + 10, 15), 28)  # Ensure x is between 16 and 28
-    #         y = min(x + 10, day)
-    #     else:
-    #         # If no payroll this month
-    #         if day < 10 or day > 18:
-    #             return Response({'error': 'Can only generate first payroll of the month between the 10th and 18th.'}, status=status.HTTP_400_BAD_REQUEST)
-            
-    #         x = day
-    #         y = min(x + 10, day)
-
-    #     # Generate the payrolls
-    #     payroll_data = []
-    #     payroll_data.extend(self._generate_payroll(current_month_start, 1, x - 1))
-    #     if y > x:
-    #         payroll_data.extend(self._generate_payroll(current_month_start, x, y))
-
-    #     return Response(payroll_data, status=status.HTTP_201_CREATED)
-
-    # def _generate_payroll(self, payroll_date, start_day, end_day):
-    #     start_date = payroll_date.replace(day=start_day)
-    #     end_date = payroll_date.replace(day=end_day)
-
-    #     # Check if payroll has already been generated for this month
-    #     if Payroll.objects.filter(month=payroll_date).exists():
-    #         logger.info(f'Payroll already exists for {payroll_date.strftime("%B %Y")}')
-    #         return []
-
-    #     # Get all artists who worked on tasks in this period
-    #     artists = Artist.objects.filter(
-    #         completed_tasks__date__range=[start_date, end_date]
-    #     ).distinct()
-
-    #     payroll_data = []
-
-    #     for artist in artists:
-    #         completed_tasks = CompletedTask.objects.filter(
-    #             artist=artist,
-    #             date__range=[start_date, end_date]
-    #         )
-            
-    #         total_earnings = Decimal('0.00')
-    #         total_items = 0
-
-    #         for task in completed_tasks:
-    #             stage_cost_map = {
-    #                 '1': 'splitting_drawing_cost',
-    #                 '2': 'carving_cutting_cost',
-    #                 '3': 'sanding_cost',
-    #                 '4': 'painting_cost',
-    #                 '5': 'finishing_cost',
-    #                 '6': 'packaging_cost',
-    #             }
-
-    #             stage_cost_field = stage_cost_map.get(task.current_stage, 'splitting_drawing_cost')
-    #             stage_cost = getattr(task.item, stage_cost_field, Decimal('0.00'))
-
-    #             task_earnings = stage_cost * task.accepted
-    #             total_earnings += task_earnings
-    #             total_items += task.accepted
-
-    #         try:
-    #             payroll = Payroll.objects.create(
-    #                 artist=artist,
-    #                 item_qty=total_items,
-    #                 total_earnings=total_earnings,
-    #                 month=payroll_date
-    #             )
-    #             payroll_data.append(PayrollSerializer(payroll).data)
-    #         except IntegrityError:
-    #             logger.error(f'Payroll entry already exists for {artist.name} in {payroll_date.strftime("%B %Y")}')
-
-    #     return payroll_data
-
     @action(detail=False, methods=['post'])
     def generate_monthly_payroll(self, request):
         # Get the month from request parameters, default to current month if not provided
@@ -136,84 +86,74 @@ class PayrollViewSet(viewsets.ModelViewSet):
         else:
             payroll_date = timezone.now().date().replace(day=1)
         
-        # Check if payroll has already been generated for this month
-        if Payroll.objects.filter(month=payroll_date).exists():
-            return Response({'error': f'Payroll already generated for {payroll_date.strftime("%B %Y")}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Get all artists who worked on tasks this month
-        artists = Artist.objects.filter(completed_tasks__date__year=payroll_date.year,
-                                        completed_tasks__date__month=payroll_date.month).distinct()
-
-        payroll_data = []
-
-        for artist in artists:
-            completed_tasks = CompletedTask.objects.filter(artist=artist,
-                                                           date__year=payroll_date.year,
-                                                           date__month=payroll_date.month)
-            
-            total_earnings = Decimal('0.00')
-            total_items = 0
-
-            for task in completed_tasks:
-                stage_cost_map = {
-                    '1': 'splitting_drawing_cost',
-                    '2': 'carving_cutting_cost',
-                    '3': 'sanding_cost',
-                    '4': 'painting_cost',
-                    '5': 'finishing_cost',
-                    '6': 'packaging_cost',
-                }
-                
-                stage_cost_field = stage_cost_map.get(task.current_stage, 'splitting_drawing_cost')
-                stage_cost = getattr(task.item, stage_cost_field, Decimal('0.00'))
-                
-                task_earnings = stage_cost * task.accepted
-                total_earnings += task_earnings
-                total_items += task.accepted
+        # A partly calculated month can be regenerated; only one whose pay periods are all closed is final
+        if services.month_closed(payroll_date):
+            return Response({'error': f'Payroll for {payroll_date.strftime("%B %Y")} is closed.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                payroll = Payroll.objects.create(
-                    artist=artist,
-                    item_qty=total_items,
-                    total_earnings=total_earnings,
-                    month=payroll_date
-                )
-                payroll_data.append(PayrollSerializer(payroll).data)
-            except IntegrityError:
-                # This should not happen due to our earlier check, but just in case
-                return Response({'error': f'Payroll entry already exists for {artist.name} in {payroll_date.strftime("%B %Y")}'}, 
-                                status=status.HTTP_400_BAD_REQUEST)
-
-        return Response(payroll_data, status=status.HTTP_201_CREATED)
+        # Generation runs on a `manage.py run_jobs` worker; poll /api/jobs/{job_id}/ for the result
+        job = enqueue_once('payroll.generate_monthly_payroll', month=payroll_date.isoformat())
+        return job_accepted(job, request)
 
     
     @action(detail=False, methods=['get'])
     def monthly_completion_stats(self, request):
-        # Get the monthly stats
-        monthly_stats = CompletedTask.objects.annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            total_completed=Sum('accepted'),
-            total_tasks=Count('id')
-        ).order_by('month')
+        # Optional ?from=YYYY-MM&to=YYYY-MM bounds, answered from the maintained rollup table
+        monthly_stats = MonthlyRollup.objects.all()
+        try:
+            if request.query_params.get('from'):
+                monthly_stats = monthly_stats.filter(month__gte=datetime.strptime(request.query_params['from'], '%Y-%m').date())
+            if request.query_params.get('to'):
+                monthly_stats = monthly_stats.filter(month__lte=datetime.strptime(request.query_params['to'], '%Y-%m').date())
+        except ValueError:
+            return Response({'error': 'Invalid month format. Use YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate earnings
-        for stat in monthly_stats:
-            payrolls = Payroll.objects.filter(
-                month__month=stat['month'].month,
-                month__year=stat['month'].year
-            )
-            total_earnings = payrolls.aggregate(Sum('total_earnings'))['total_earnings__sum'] or Decimal('0.00')
-            stat['total_earnings'] = total_earnings
+        monthly_stats = monthly_stats.values(
+            'month', 'total_completed', 'total_tasks', 'total_earnings'
+        ).order_by('month')
 
         return Response(monthly_stats)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        # Streams every Payroll row of ?period=<id> or of all periods starting in ?month=YYYY-MM,
+        # as CSV (default) or JSON Lines with ?output=jsonl
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'jsonl'):
+            return Response({'error': 'output must be csv or jsonl.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        periods = PayrollPeriod.objects.order_by('start_date')
+        try:
+            if request.query_params.get('period'):
+                periods = periods.filter(pk=int(request.query_params['period']))
+            elif request.query_params.get('month'):
+                month = datetime.strptime(request.query_params['month'], '%Y-%m').date()
+                periods = periods.filter(start_date__year=month.year, start_date__month=month.month)
+            else:
+                return Response({'error': 'Provide period or month.'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'Invalid period id or month format (YYYY-MM).'}, status=status.HTTP_400_BAD_REQUEST)
+
+        periods = list(periods)
+        if not periods:
+            return Response({'error': 'No payroll periods found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        rows = services.export_rows(periods)
+        if output == 'csv':
+            content, content_type = export_csv(rows), 'text/csv'
+        else:
+            content, content_type = export_jsonl(rows), 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"payroll-{periods[0].start_date}-{periods[-1].end_date}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=False, methods=['get'])
     def current_month_payroll(self, request):
         current_date = timezone.now().date()
         current_month = datetime(current_date.year, current_date.month, 1).date()
         
-        payrolls = Payroll.objects.filter(
+        payrolls = self.get_queryset().filter(
             month=current_month
         ).filter(
             Q(item_qty__gt=0) | Q(total_earnings__gt=0)
@@ -223,58 +163,46 @@ class PayrollViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+    @action(detail=False, methods=['post'])
+    def generate_bonuses(self, request):
+        try:
+            year = int(request.data.get('year', timezone.now().year))
+            bonus_percentage = Decimal(str(request.data.get('percentage', request.data.get('bonus_percentage', '5'))))
+        except (TypeError, ValueError, InvalidOperation):
+            return Response({'error': 'Invalid year or bonus percentage.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if bonus_percentage < 0 or bonus_percentage > 100:
+            return Response({'error': 'Bonus percentage must be between 0 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+
+        bonuses = services.generate_annual_bonuses(year, bonus_percentage)
+
+        return Response({
+            'message': f'Generated {len(bonuses)} bonuses for year {year}.',
+            'year': year,
+            'bonus_count': len(bonuses),
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'])
     def annual_artist_stats(self, request):
         try:
-            current_year = timezone.now().year
-            year = int(request.query_params.get('year', current_year))
-            bonus_percentage = Decimal(request.query_params.get('bonus_percentage', '5'))
-
-            if bonus_percentage < 0 or bonus_percentage > 100:
-                return Response({'error': 'Bonus percentage must be between 0 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+            year = int(request.query_params.get('year', timezone.now().year))
+        except ValueError:
+            return Response({'error': 'Invalid year format.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            start_date = datetime(year, 1, 1).date()
-            end_date = datetime(year, 12, 31).date()
-            
-            annual_stats = Payroll.objects.filter(
-                month__range=[start_date, end_date]
-            ).values('artist', 'artist__name').annotate(
-                total_earnings=Sum('total_earnings'),
-                total_items=Sum('item_qty')
-            ).order_by('-total_earnings')
+        # Read-only: bonuses are computed by generate_bonuses, so this never takes a write lock
+        bonuses = AnnualBonus.objects.filter(year=year).select_related('artist').order_by('-annual_earnings')
 
-            result = []
+        result = [{
+            'artist_id': bonus.artist_id,
+            'artist_name': bonus.artist.name,
+            'total_earnings': float(bonus.annual_earnings),
+            'total_items': bonus.item_qty,
+            'bonus_percentage': float(bonus.bonus_percentage),
+            'bonus_amount': float(bonus.bonus_amount),
+            'bonus_status': bonus.status,
+        } for bonus in bonuses]
 
-            with transaction.atomic():
-                for stat in annual_stats:
-                    artist = Artist.objects.get(id=stat['artist'])
-                    bonus_amount = (stat['total_earnings'] * bonus_percentage) / Decimal('100')
-
-                    annual_bonus, created = AnnualBonus.objects.update_or_create(
-                        artist=artist,
-                        year=year,
-                        defaults={
-                            'annual_earnings': stat['total_earnings'],
-                            'bonus_percentage': bonus_percentage,
-                            'bonus_amount': bonus_amount,
-                        }
-                    )
-
-                    result.append({
-                        'artist_id': stat['artist'],
-                        'artist_name': stat['artist__name'],
-                        'total_earnings': float(stat['total_earnings']),
-                        'total_items': stat['total_items'],
-                        'bonus_amount': float(bonus_amount),
-                        'bonus_status': annual_bonus.status
-                    })
-
-            return Response(result)
-
-        except ValueError as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(result)
         
 
     @action(detail=False, methods=['post'])
@@ -305,4 +233,32 @@ class PayrollViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({'error': 'Invalid year format.'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PayrollPeriodViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = PayrollPeriod.objects.all()
+    serializer_class = PayrollPeriodSerializer
+
+    @action(detail=False, methods=['post'])
+    def calculate(self, request):
+        # Recalculate the open period containing `date` (YYYY-MM-DD, default today)
+        date_param = request.data.get('date')
+        try:
+            day = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else timezone.now().date()
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        period = services.get_period(day)
+        if period.status == 'CLOSED':
+            return Response({'error': f'Pay period {period} is closed.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue_once('payroll.calculate_period', period_id=period.id)
+        return job_accepted(job, request)
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        period = self.get_object()
+        period.status = 'CLOSED'
+        period.save(update_fields=['status'])
+        return Response(self.get_serializer(period).data)
@@ -0,0 +1,66 @@
+from django.db import migrations, models
+from django.db.models import Case, When, F
+
+STAGE_COST_FIELDS = {
+    '1': 'splitting_drawing_cost',
+    '2': 'carving_cutting_cost',
+    '3': 'sanding_cost',
+    '4': 'painting_cost',
+    '5': 'finishing_cost',
+    '6': 'packaging_cost',
+}
+
+
+def snapshot_rates(apps, schema_editor):
+    CompletedTask = apps.get_model('production', 'CompletedTask')
+    Item = apps.get_model('inventory', 'Item')
+
+    # Correlated subquery per stage, so the backfill is a single UPDATE
+    def item_cost(field):
+        return models.Subquery(Item.objects.filter(pk=models.OuterRef('item_id')).values(field)[:1])
+
+    CompletedTask.objects.update(
+        unit_rate=Case(
+            *[When(current_stage=stage, then=item_cost(field)) for stage, field in STAGE_COST_FIELDS.items()],
+            default=item_cost('splitting_drawing_cost'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    CompletedTask.objects.update(earnings=F('unit_rate') * F('accepted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_artist_specialization'),
+        ('inventory', '0001_initial'),
+        ('production', '0008_alter_completedtask_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completedtask',
+            name='unit_rate',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='completedtask',
+            name='earnings',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(snapshot_rates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='completedtask',
+            name='unit_rate',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='completedtask',
+            name='earnings',
+            field=models.DecimalField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='completedtask',
+            index=models.Index(fields=['artist', 'date'], name='production__artist__137e1b_idx'),
+        ),
+    ]
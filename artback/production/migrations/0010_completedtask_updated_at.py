@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0009_completedtask_unit_rate_earnings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completedtask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-17 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_artist_specialization'),
+        ('inventory', '0001_initial'),
+        ('production', '0010_completedtask_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completedtask',
+            index=models.Index(fields=['date'], name='production__date_22c58b_idx'),
+        ),
+    ]
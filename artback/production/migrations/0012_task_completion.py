@@ -0,0 +1,46 @@
+# Generated by Django 5.1 on 2026-10-17 20:01
+
+from datetime import datetime, time
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_completed_at(apps, schema_editor):
+    # When existing tasks were completed wasn't recorded; their planned end date is the closest known
+    ProductionTask = apps.get_model('production', 'ProductionTask')
+    tasks = list(ProductionTask.objects.filter(status='C', completed_at__isnull=True).only('id', 'end_date'))
+    for task in tasks:
+        task.completed_at = timezone.make_aware(datetime.combine(task.end_date, time.min))
+    ProductionTask.objects.bulk_update(tasks, ['completed_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0011_completedtask_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productiontask',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productiontask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='qualitycheck',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='qualitycheck',
+            name='check_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
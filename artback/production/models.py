@@ -21,6 +21,17 @@ CURRENT_STAGE_CHOICES = [
     ('6', 'Packaging'),
     ('7', 'Done')
 ]
+# Item cost field paid out for work completed at each stage
+STAGE_COST_FIELDS = {
+    '1': 'splitting_drawing_cost',
+    '2': 'carving_cutting_cost',
+    '3': 'sanding_cost',
+    '4': 'painting_cost',
+    '5': 'finishing_cost',
+    '6': 'packaging_cost',
+}
+DEFAULT_STAGE_COST_FIELD = 'splitting_drawing_cost'
+FINAL_STAGE = '6'  # Units accepted here are finished items
 DEPARTMENT_CHOICES = [
     ('C', 'Carpentry'),
     ('P', 'Painting'),
@@ -38,6 +49,8 @@ class ProductionTask(models.Model):
     accepted = models.IntegerField(default=0)
 
     rejection_count = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)  # When status last became Completed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Drives the incremental production report
 
     def __str__(self):
         return f"{self.item.name} - {self.artist.name} - {self.start_date}"
@@ -48,12 +61,34 @@ class CompletedTask(models.Model):
     accepted = models.PositiveIntegerField()
     current_stage = models.CharField(max_length=1, choices=CURRENT_STAGE_CHOICES)
     date = models.DateTimeField(default=timezone.now)
+    unit_rate = models.DecimalField(max_digits=10, decimal_places=2)  # Item's stage cost when the work was recorded
+    earnings = models.DecimalField(max_digits=12, decimal_places=2)  # unit_rate * accepted
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Drives incremental payroll recalculation
 
     def __str__(self):
         return f"{self.item.name} - {self.artist.name} - Stage {self.current_stage} - {self.date.date()}"
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['artist', 'date']),
+            models.Index(fields=['date']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Snapshot the rate on first save so later price changes don't rewrite past earnings
+        self.price(snapshot=self.unit_rate is None)
+        super().save(*args, **kwargs)
+
+    def price(self, snapshot=False):
+        """Set earnings from the rate, taking a fresh snapshot of the item's stage cost if asked."""
+        if snapshot:
+            self.unit_rate = self.stage_rate(self.item, self.current_stage)
+        self.earnings = self.unit_rate * self.accepted
+
+    @staticmethod
+    def stage_rate(item, stage):
+        return getattr(item, STAGE_COST_FIELDS.get(stage, DEFAULT_STAGE_COST_FIELD))
 
 class RejectionHistory(models.Model):
     DEPARTMENT_CHOICES = [
@@ -84,9 +119,10 @@ class QualityCheck(models.Model):
 
     production_task = models.ForeignKey(ProductionTask, on_delete=models.CASCADE, related_name='quality_checks')
     checked_by = models.ForeignKey('core.StaffMember', on_delete=models.CASCADE, related_name='quality_checks')
-    check_date = models.DateTimeField(auto_now_add=True)
+    check_date = models.DateTimeField(auto_now_add=True, db_index=True)
     result = models.CharField(max_length=4, choices=RESULT_CHOICES)
     notes = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Drives the incremental production report
 
     def __str__(self):
         return f"Quality Check for {self.production_task} - {self.result}"
\ No newline at end of file
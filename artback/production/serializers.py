@@ -1,10 +1,12 @@
 # production/serializers.py
+from django.utils import timezone
 from rest_framework import serializers
 from .models import ProductionTask, QualityCheck, RejectionHistory, CompletedTask
 from core.models import StaffMember
 from authentication.models import Artist
 from inventory.models import Item
 from core.serializers import StaffMemberSerializer
+from reports.models import StaleReportDay
 # from authentication.serializers import ArtistSerializer
 # from inventory.serializers import ItemSerializer
 
@@ -18,6 +20,8 @@ class ProductionTaskSerializer(serializers.ModelSerializer):
         fields = ['id', 'item', 'item_name', 'artist', 'artist_name', 'quantity', 'start_date', 'end_date', 'status', 'notes', 'current_stage', 'accepted', 'rejection_count', 'new_artist_id']
 
     def create(self, validated_data):
+        if validated_data.get('status') == 'C':
+            validated_data['completed_at'] = timezone.now()
         return ProductionTask.objects.create(**validated_data)
     
     def update(self, instance, validated_data):
@@ -28,6 +32,13 @@ class ProductionTaskSerializer(serializers.ModelSerializer):
                 instance.artist = new_artist
             except Artist.DoesNotExist:
                 raise serializers.ValidationError("Artist with the given ID does not exist.")
+        new_status = validated_data.get('status', instance.status)
+        if new_status == 'C' and instance.status != 'C':
+            validated_data['completed_at'] = timezone.now()
+        elif new_status != 'C' and instance.completed_at:
+            # The day it was completed on loses the task, which the report's watermark can't see
+            StaleReportDay.mark('production', timezone.localdate(instance.completed_at))
+            validated_data['completed_at'] = None
         return super().update(instance, validated_data)
     
 class CompletedTaskSerializer(serializers.ModelSerializer):
@@ -36,8 +47,8 @@ class CompletedTaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CompletedTask
-        fields = ['id', 'item', 'item_name', 'artist', 'artist_name', 'accepted', 'current_stage', 'date']
-        read_only_fields = ['id', 'date']
+        fields = ['id', 'item', 'item_name', 'artist', 'artist_name', 'accepted', 'current_stage', 'date', 'unit_rate', 'earnings']
+        read_only_fields = ['id', 'date', 'unit_rate', 'earnings']
     
 class RejectionHistorySerializer(serializers.ModelSerializer):
     production_task = serializers.PrimaryKeyRelatedField(queryset=ProductionTask.objects.all())
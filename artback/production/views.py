@@ -1,10 +1,13 @@
 # production/views.py
 import logging
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import ProductionTask, QualityCheck, RejectionHistory, CompletedTask
 from .serializers import ProductionTaskSerializer, QualityCheckSerializer, RejectionHistorySerializer, CompletedTaskSerializer
+from inventory.services import adjust_stock
 
 logger = logging.getLogger(__name__)
 
@@ -62,19 +65,24 @@ class ProductionTaskViewSet(viewsets.ModelViewSet):
         if task.status != 'I':  # Assuming 'I' is for 'In Progress'
             return Response({'error': 'Only in-progress tasks can be completed.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        task.status = 'C'  # Assuming 'C' is for 'Completed'
-        task.save()
+        with transaction.atomic():
+            # Conditional update so a task completed twice concurrently only adds its stock once
+            now = timezone.now()
+            if not ProductionTask.objects.filter(pk=task.pk, status='I').update(status='C', completed_at=now, updated_at=now):  # 'C' is for 'Completed'
+                return Response({'error': 'Only in-progress tasks can be completed.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update inventory
-        task.item.stock += task.quantity
-        task.item.save()
+            # Update inventory
+            adjust_stock(task.item, task.quantity)
 
         return Response({'message': 'Production task completed successfully.'})
     
     @action(detail=True, methods=['post'])
     def accept_task(self, request, pk=None):
         task = self.get_object()
-        accepted = request.data.get('accepted', 0)
+        try:
+            accepted = int(request.data.get('accepted', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'Accepted quantity must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Create a CompletedTask
         CompletedTask.objects.create(
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import SalesReport, ProductionReport, ReportState, StaleReportDay
 
 # Register your models here.
+admin.site.register(SalesReport)
+admin.site.register(ProductionReport)
+admin.site.register(ReportState)
+admin.site.register(StaleReportDay)
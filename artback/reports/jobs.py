@@ -0,0 +1,19 @@
+# reports/jobs.py
+from datetime import timedelta
+
+from django.conf import settings
+
+from jobs.registry import scheduled_job
+from . import services
+
+REFRESH_INTERVAL = timedelta(seconds=settings.REPORT_REFRESH_SECONDS)
+
+
+@scheduled_job('reports.refresh_sales', every=REFRESH_INTERVAL)
+def refresh_sales(job):
+    return {'recomputed_days': services.refresh_sales_reports()}
+
+
+@scheduled_job('reports.refresh_production', every=REFRESH_INTERVAL)
+def refresh_production(job):
+    return {'recomputed_days': services.refresh_production_reports()}
@@ -0,0 +1,12 @@
+# reports/management/commands/materialize_production.py
+from reports import services
+from .materialize_sales import Command as MaterializeCommand
+
+
+class Command(MaterializeCommand):
+    help = ('Materialize daily ProductionReport rows from final-stage work, task completions and quality '
+            'checks: by default only the days changed since the last run, or a whole range with --backfill.')
+    refresh = staticmethod(services.refresh_production_reports)
+    backfill = staticmethod(services.backfill_production_reports)
+    activity = 'production'
+    first_source = 'the first production activity'
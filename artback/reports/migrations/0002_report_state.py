@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-17 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=20, unique=True)),
+                ('watermark', models.DateTimeField(blank=True, null=True)),
+                ('last_run', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StaleReportDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+            ],
+            options={
+                'unique_together': {('report', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1 on 2026-10-17 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productionreport',
+            name='quality_checks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='productionreport',
+            name='quality_passes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='productionreport',
+            name='quality_pass_rate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -1,7 +1,14 @@
 # reports/models.py
 from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from orders.models import Order
+from production.models import FINAL_STAGE, CompletedTask, ProductionTask, QualityCheck
 
 class SalesReport(models.Model):
+    # One row per day with sales, materialized from orders by services.refresh_sales_reports
     date = models.DateField(unique=True)
     total_sales = models.DecimalField(max_digits=10, decimal_places=2)
     total_orders = models.PositiveIntegerField()
@@ -11,11 +18,72 @@ class SalesReport(models.Model):
         return f"Sales Report for {self.date}"
 
 class ProductionReport(models.Model):
+    # One row per day with production activity, materialized by services.refresh_production_reports
     date = models.DateField(unique=True)
-    total_items_produced = models.PositiveIntegerField()
-    total_tasks_completed = models.PositiveIntegerField()
-    quality_pass_rate = models.FloatField()
+    total_items_produced = models.PositiveIntegerField()  # Units accepted at the final stage
+    total_tasks_completed = models.PositiveIntegerField()  # Production tasks completed
+    quality_checks = models.PositiveIntegerField(default=0)
+    quality_passes = models.PositiveIntegerField(default=0)
+    quality_pass_rate = models.FloatField(null=True, blank=True)  # Percent of checks passed; None without checks
 
     def __str__(self):
         return f"Production Report for {self.date}"
-    
+
+class ReportState(models.Model):
+    """How far the incremental materializer of one report has got."""
+    report = models.CharField(max_length=20, unique=True)
+    # Source rows updated after this have not been materialized yet; None means rebuild every day
+    watermark = models.DateTimeField(null=True, blank=True)
+    last_run = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report} materialized up to {self.watermark}"
+
+class StaleReportDay(models.Model):
+    """A day whose source rows were deleted, which the watermark can't see; the next run recomputes it."""
+    report = models.CharField(max_length=20)
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ['report', 'date']
+
+    @classmethod
+    def mark(cls, report, day):
+        cls.objects.bulk_create([cls(report=report, date=day)], ignore_conflicts=True)
+
+
+@receiver(post_delete, sender=Order)
+def mark_sales_day_stale(sender, instance, **kwargs):
+    StaleReportDay.mark('sales', timezone.localdate(instance.order_date))
+
+
+# Deleted production rows take their day's figures with them
+@receiver(post_delete, sender=CompletedTask)
+def mark_completed_task_day_stale(sender, instance, **kwargs):
+    if instance.current_stage == FINAL_STAGE:
+        StaleReportDay.mark('production', timezone.localdate(instance.date))
+
+@receiver(pre_save, sender=CompletedTask)
+def remember_completed_task_day(sender, instance, **kwargs):
+    if instance.pk:
+        instance._report_previous = CompletedTask.objects.filter(pk=instance.pk).values('date', 'current_stage').first()
+
+# A row moved to another day leaves its old day behind, which the watermark can't see either
+@receiver(post_save, sender=CompletedTask)
+def mark_moved_completed_task_days_stale(sender, instance, **kwargs):
+    previous = getattr(instance, '_report_previous', None)
+    if previous is None or previous['date'] == instance.date:
+        return
+    if previous['current_stage'] == FINAL_STAGE:
+        StaleReportDay.mark('production', timezone.localdate(previous['date']))
+    if instance.current_stage == FINAL_STAGE:
+        StaleReportDay.mark('production', timezone.localdate(instance.date))
+
+@receiver(post_delete, sender=ProductionTask)
+def mark_production_task_day_stale(sender, instance, **kwargs):
+    if instance.completed_at:
+        StaleReportDay.mark('production', timezone.localdate(instance.completed_at))
+
+@receiver(post_delete, sender=QualityCheck)
+def mark_quality_check_day_stale(sender, instance, **kwargs):
+    StaleReportDay.mark('production', timezone.localdate(instance.check_date))
@@ -10,4 +10,18 @@ class SalesReportSerializer(serializers.ModelSerializer):
 class ProductionReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductionReport
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class SalesPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    total_sales = serializers.DecimalField(max_digits=16, decimal_places=2)
+    total_orders = serializers.IntegerField()
+    average_order_value = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class ProductionPeriodSerializer(serializers.Serializer):
+    period = serializers.DateField()
+    total_items_produced = serializers.IntegerField()
+    total_tasks_completed = serializers.IntegerField()
+    quality_checks = serializers.IntegerField()
+    quality_passes = serializers.IntegerField()
+    quality_pass_rate = serializers.FloatField(allow_null=True)
@@ -0,0 +1,296 @@
+# reports/services.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from inventory.services import end_of_day
+from orders.models import Order
+from orders.services import revenue_by_period
+from production.models import FINAL_STAGE, CompletedTask, ProductionTask, QualityCheck
+from .models import ProductionReport, ReportState, SalesReport, StaleReportDay
+
+CENTS = Decimal('.01')
+WATERMARK_GRACE = timedelta(minutes=1)
+CHUNK_DAYS = 31
+SALES = 'sales'
+PRODUCTION = 'production'
+ROLLUPS = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def day_spans(days, chunk_days=CHUNK_DAYS):
+    """Group dates into (first_day, last_day) runs of consecutive days, none longer than chunk_days."""
+    spans = []
+    for day in sorted(set(days)):
+        if spans and day - spans[-1][1] == timedelta(days=1) and (day - spans[-1][0]).days < chunk_days:
+            spans[-1][1] = day
+        else:
+            spans.append([day, day])
+    return [tuple(span) for span in spans]
+
+
+def span_days(first_day, last_day):
+    return [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+
+
+def materialize_sales(first_day, last_day):
+    """
+    Recompute the SalesReport rows of first_day..last_day from the orders placed
+    then, cancelled ones excluded.
+
+    The totals come from one grouped read over the order_date index, taken
+    outside any transaction so parallel backfill chunks can read at once;
+    only the upsert and the removal of days left without sales are written
+    together. Returns the number of days with sales.
+    """
+    rows = revenue_by_period(end_of_day(first_day - timedelta(days=1)), end_of_day(last_day), 'day')
+    reports = [
+        SalesReport(
+            date=row['period'],
+            total_sales=Decimal(row['revenue'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP),
+            total_orders=row['orders'],
+            average_order_value=Decimal(row['average_order_value'] or 0).quantize(CENTS, rounding=ROUND_HALF_UP),
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        SalesReport.objects.bulk_create(
+            reports,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['total_sales', 'total_orders', 'average_order_value'],
+        )
+        SalesReport.objects.filter(date__range=(first_day, last_day)).exclude(
+            date__in=[report.date for report in reports]
+        ).delete()
+    return len(reports)
+
+
+def history_since(*firsts):
+    """(first_day, today) from the earliest of the given datetimes, or None if they are all None."""
+    firsts = [first for first in firsts if first is not None]
+    if not firsts:
+        return None
+    return timezone.localdate(min(firsts)), timezone.localdate()
+
+
+def days_of(queryset, field):
+    """The distinct local dates of `field` over the queryset's rows."""
+    return set(queryset.annotate(day=TruncDate(field)).values_list('day', flat=True).distinct())
+
+
+def sales_history():
+    return history_since(Order.objects.aggregate(first=Min('order_date'))['first'])
+
+
+def sales_touched_days(since):
+    """Order dates of the orders changed since `since`, read through the updated_at index."""
+    return days_of(Order.objects.filter(updated_at__gt=since), 'order_date')
+
+
+def refresh(report, materialize, touched_days, history):
+    """
+    Bring a materialized report up to date.
+
+    The first run materializes every day of history(). Later runs only
+    recompute touched_days(since the watermark) and the days marked stale
+    by deletions, so the cost follows the activity since the last run
+    rather than the history. Returns the number of days recomputed.
+    """
+    state, _ = ReportState.objects.get_or_create(report=report)
+    run_started = timezone.now()
+    stale = dict(StaleReportDay.objects.filter(report=report).values_list('id', 'date'))
+
+    if state.watermark is None:
+        span = history()
+        days = set(span_days(*span)) if span else set()
+    else:
+        # The grace window re-reads rows stamped just before the last run but committed after it
+        days = touched_days(state.watermark - WATERMARK_GRACE)
+    days |= set(stale.values())
+
+    for first_day, last_day in day_spans(days):
+        materialize(first_day, last_day)
+
+    with transaction.atomic():
+        StaleReportDay.objects.filter(id__in=list(stale)).delete()
+        state.watermark = state.last_run = run_started
+        state.save(update_fields=['watermark', 'last_run'])
+    return len(days)
+
+
+def refresh_sales_reports():
+    return refresh(SALES, materialize_sales, sales_touched_days, sales_history)
+
+
+def materialize_chunk(materialize, first_day, last_day):
+    # Runs in a pool thread; Django gives each thread its own connection
+    try:
+        return materialize(first_day, last_day)
+    finally:
+        connection.close()
+
+
+def backfill(materialize, first_day, last_day, workers=4, chunk_days=CHUNK_DAYS):
+    """
+    Run materialize(first, last) over first_day..last_day in chunks of
+    chunk_days, `workers` chunks at a time. Returns the summed results.
+    """
+    spans = day_spans(span_days(first_day, last_day), chunk_days)
+    if workers <= 1:
+        return sum(materialize(*span) for span in spans)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(lambda span: materialize_chunk(materialize, *span), spans))
+
+
+def rebuild(report, materialize, history, first_day=None, last_day=None, workers=4):
+    """
+    Rebuild a report for first_day..last_day (default: all of history()) in
+    parallel chunks. A full rebuild also resets the watermark, so the next
+    incremental run starts from here.
+    """
+    full = first_day is None and last_day is None
+    span = history()
+    if span is None:
+        return 0
+    first_day, last_day = first_day or span[0], last_day or span[1]
+
+    run_started = timezone.now()
+    stale = list(StaleReportDay.objects.filter(report=report).values_list('id', flat=True))
+    days = backfill(materialize, first_day, last_day, workers)
+    if full:
+        with transaction.atomic():
+            StaleReportDay.objects.filter(id__in=stale).delete()
+            ReportState.objects.update_or_create(
+                report=report, defaults={'watermark': run_started, 'last_run': run_started},
+            )
+    return days
+
+
+def backfill_sales_reports(first_day=None, last_day=None, workers=4):
+    return rebuild(SALES, materialize_sales, sales_history, first_day, last_day, workers)
+
+
+def materialize_production(first_day, last_day):
+    """
+    Recompute the ProductionReport rows of first_day..last_day: units accepted
+    at the final stage (CompletedTask), production tasks completed and the
+    quality checks run and passed, each one grouped read over its date index.
+    Days left without any activity are removed. Returns the number of days
+    with activity.
+    """
+    start, end = end_of_day(first_day - timedelta(days=1)), end_of_day(last_day)
+    produced = dict(
+        CompletedTask.objects.filter(date__gte=start, date__lt=end, current_stage=FINAL_STAGE).annotate(
+            day=TruncDate('date'),
+        ).values('day').annotate(units=Sum('accepted')).values_list('day', 'units').order_by()
+    )
+    completed = dict(
+        ProductionTask.objects.filter(completed_at__gte=start, completed_at__lt=end, status='C').annotate(
+            day=TruncDate('completed_at'),
+        ).values('day').annotate(tasks=Count('id')).values_list('day', 'tasks').order_by()
+    )
+    checks = {
+        day: (total, passed)
+        for day, total, passed in QualityCheck.objects.filter(check_date__gte=start, check_date__lt=end).annotate(
+            day=TruncDate('check_date'),
+        ).values('day').annotate(
+            total=Count('id'),
+            passed=Count('id', filter=Q(result='PASS')),
+        ).values_list('day', 'total', 'passed').order_by()
+    }
+
+    reports = []
+    for day in sorted(produced.keys() | completed.keys() | checks.keys()):
+        total, passed = checks.get(day, (0, 0))
+        reports.append(ProductionReport(
+            date=day,
+            total_items_produced=max(produced.get(day) or 0, 0),
+            total_tasks_completed=completed.get(day, 0),
+            quality_checks=total,
+            quality_passes=passed,
+            quality_pass_rate=pass_rate(passed, total),
+        ))
+    with transaction.atomic():
+        ProductionReport.objects.bulk_create(
+            reports,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['total_items_produced', 'total_tasks_completed', 'quality_checks', 'quality_passes',
+                           'quality_pass_rate'],
+        )
+        ProductionReport.objects.filter(date__range=(first_day, last_day)).exclude(
+            date__in=[report.date for report in reports]
+        ).delete()
+    return len(reports)
+
+
+def pass_rate(passed, total):
+    return round(100 * passed / total, 2) if total else None
+
+
+def production_history():
+    return history_since(
+        CompletedTask.objects.filter(current_stage=FINAL_STAGE).aggregate(first=Min('date'))['first'],
+        ProductionTask.objects.aggregate(first=Min('completed_at'))['first'],
+        QualityCheck.objects.aggregate(first=Min('check_date'))['first'],
+    )
+
+
+def production_touched_days(since):
+    """Days of the completed work, task completions and quality checks changed since `since`."""
+    # Completed work at any stage, so a row moved off the final stage still recomputes its day
+    return (
+        days_of(CompletedTask.objects.filter(updated_at__gt=since), 'date') |
+        days_of(ProductionTask.objects.filter(updated_at__gt=since, completed_at__isnull=False), 'completed_at') |
+        days_of(QualityCheck.objects.filter(updated_at__gt=since), 'check_date')
+    )
+
+
+def refresh_production_reports():
+    return refresh(PRODUCTION, materialize_production, production_touched_days, production_history)
+
+
+def backfill_production_reports(first_day=None, last_day=None, workers=4):
+    return rebuild(PRODUCTION, materialize_production, production_history, first_day, last_day, workers)
+
+
+def sales_rollup(first_day, last_day, period='day'):
+    """SalesReport rows of first_day..last_day, summed per week or month unless period is 'day'."""
+    reports = SalesReport.objects.filter(date__range=(first_day, last_day))
+    if period == 'day':
+        rows = [{'period': row.pop('date'), **row}
+                for row in reports.order_by('date').values('date', 'total_sales', 'total_orders')]
+    else:
+        rows = reports.annotate(period=ROLLUPS[period]('date', output_field=DateField())).values('period').annotate(
+            total_sales=Sum('total_sales'),
+            total_orders=Sum('total_orders'),
+        ).order_by('period')
+
+    for row in rows:
+        row['average_order_value'] = (
+            (Decimal(row['total_sales']) / row['total_orders']).quantize(CENTS, rounding=ROUND_HALF_UP)
+            if row['total_orders'] else Decimal('0.00')
+        )
+    return rows
+
+
+def production_rollup(first_day, last_day, period='day'):
+    """ProductionReport rows of first_day..last_day, summed per week or month unless period is 'day'."""
+    reports = ProductionReport.objects.filter(date__range=(first_day, last_day))
+    fields = ['total_items_produced', 'total_tasks_completed', 'quality_checks', 'quality_passes']
+    if period == 'day':
+        rows = [{'period': row.pop('date'), **row} for row in reports.order_by('date').values('date', *fields)]
+    else:
+        rows = reports.annotate(period=ROLLUPS[period]('date', output_field=DateField())).values('period').annotate(
+            **{field: Sum(field) for field in fields}
+        ).order_by('period')
+
+    for row in rows:
+        # Rates are recomputed from the counts so a rolled-up period weighs each check equally
+        row['quality_pass_rate'] = pass_rate(row['quality_passes'], row['quality_checks'])
+    return rows
@@ -1,3 +1,67 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from authentication.models import Artist
+from inventory.models import Category, Item
+from jobs.models import Job
+from orders.models import Customer, Order
+from production.models import FINAL_STAGE, CompletedTask
+from . import services
+from .models import ProductionReport, SalesReport
+
+
+def run_worker():
+    call_command('run_jobs', once=True, stdout=StringIO())
+
+
+class ScheduledRefreshTests(TransactionTestCase):
+    """The job worker keeps the materialized reports current without anyone running their commands."""
+
+    def test_worker_refreshes_sales(self):
+        customer = Customer.objects.create(name='Customer')
+        Order.objects.create(customer=customer, total_amount=Decimal('120.00'))
+        run_worker()
+        report = SalesReport.objects.get(date=timezone.localdate())
+        self.assertEqual((report.total_sales, report.total_orders), (Decimal('120.00'), 1))
+
+        # Not due again until the interval has passed
+        Order.objects.create(customer=customer, total_amount=Decimal('30.00'))
+        run_worker()
+        self.assertEqual(Job.objects.filter(kind='reports.refresh_sales').count(), 1)
+
+        Job.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        run_worker()
+        report.refresh_from_db()
+        self.assertEqual((report.total_sales, report.total_orders), (Decimal('150.00'), 2))
+        self.assertEqual(Job.objects.filter(kind='reports.refresh_sales', status='DONE').count(), 2)
+
+    def test_worker_refreshes_production(self):
+        item = Item.objects.create(name='Giraffe', category=Category.objects.create(name='Carvings'), selling_price=50)
+        artist = Artist.objects.create(name='Artist', phone_number='1')
+        CompletedTask.objects.create(item=item, artist=artist, accepted=4, current_stage=FINAL_STAGE)
+        run_worker()
+        self.assertEqual(ProductionReport.objects.get(date=timezone.localdate()).total_items_produced, 4)
+
+        CompletedTask.objects.create(item=item, artist=artist, accepted=3, current_stage=FINAL_STAGE)
+        Job.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        run_worker()
+        self.assertEqual(ProductionReport.objects.get(date=timezone.localdate()).total_items_produced, 7)
+        self.assertEqual(Job.objects.filter(kind='reports.refresh_production', status='DONE').count(), 2)
+
+    def test_moving_a_task_to_another_day_refreshes_both_days(self):
+        item = Item.objects.create(name='Giraffe', category=Category.objects.create(name='Carvings'), selling_price=50)
+        artist = Artist.objects.create(name='Artist', phone_number='1')
+        task = CompletedTask.objects.create(item=item, artist=artist, accepted=4, current_stage=FINAL_STAGE)
+        services.refresh_production_reports()
+        today = timezone.localdate()
+
+        task.date -= timedelta(days=3)
+        task.save()
+        services.refresh_production_reports()
+        self.assertFalse(ProductionReport.objects.filter(date=today).exists())
+        self.assertEqual(ProductionReport.objects.get(date=today - timedelta(days=3)).total_items_produced, 4)
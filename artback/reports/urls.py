@@ -1,12 +1,13 @@
 # reports/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SalesReportViewSet, ProductionReportViewSet
+from .views import SalesReportViewSet, ProductionReportViewSet, report_summary
 
 router = DefaultRouter()
 router.register(r'sales-reports', SalesReportViewSet)
 router.register(r'production-reports', ProductionReportViewSet)
 
 urlpatterns = [
+    path('reports/', report_summary, name='report-summary'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,12 +1,96 @@
 # reports/views.py
-from rest_framework import viewsets
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action, api_view
+from rest_framework.response import Response
 from .models import SalesReport, ProductionReport
-from .serializers import SalesReportSerializer, ProductionReportSerializer
+from .serializers import (
+    SalesReportSerializer, ProductionReportSerializer, SalesPeriodSerializer, ProductionPeriodSerializer,
+)
+from .services import ROLLUPS, production_rollup, sales_rollup
+
+DEFAULT_RANGE_DAYS = 30
+
+
+def parse_range(params, required=True):
+    """
+    (first_day, last_day) from the ?from=/?to= YYYY-MM-DD params, or an error Response.
+    When they are not required, a missing ?to= defaults to today and ?from= to the 30 days before it.
+    """
+    try:
+        if required or params.get('to'):
+            last_day = datetime.strptime(params.get('to', ''), '%Y-%m-%d').date()
+        else:
+            last_day = timezone.localdate()
+        if required or params.get('from'):
+            first_day = datetime.strptime(params.get('from', ''), '%Y-%m-%d').date()
+        else:
+            first_day = last_day - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        message = 'from and to are required as YYYY-MM-DD.' if required else 'from and to must be YYYY-MM-DD.'
+        return None, Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+    if first_day > last_day:
+        return None, Response({'error': 'from must not be after to.'}, status=status.HTTP_400_BAD_REQUEST)
+    return (first_day, last_day), None
+
+
+def parse_period(params):
+    """The ?period= roll-up (default day), or an error Response."""
+    period = params.get('period', 'day')
+    if period != 'day' and period not in ROLLUPS:
+        return None, Response({'error': 'period must be day, week or month'}, status=status.HTTP_400_BAD_REQUEST)
+    return period, None
 
-class SalesReportViewSet(viewsets.ModelViewSet):
-    queryset = SalesReport.objects.all()
+
+class SalesReportViewSet(viewsets.ReadOnlyModelViewSet):
+    # Written only by the materializer (services.refresh_sales_reports and the materialize_sales command)
+    queryset = SalesReport.objects.all().order_by('date')
     serializer_class = SalesReportSerializer
 
-class ProductionReportViewSet(viewsets.ModelViewSet):
-    queryset = ProductionReport.objects.all()
-    serializer_class = ProductionReportSerializer
\ No newline at end of file
+    @action(detail=False, methods=['get'], url_path='range')
+    def date_range(self, request):
+        # Daily rows between ?from= and ?to=, rolled up on the server with ?period=week|month
+        days, error = parse_range(request.query_params)
+        if error:
+            return error
+        period, error = parse_period(request.query_params)
+        if error:
+            return error
+        return Response(SalesPeriodSerializer(sales_rollup(*days, period), many=True).data)
+
+
+class ProductionReportViewSet(viewsets.ReadOnlyModelViewSet):
+    # Written only by the materializer (services.refresh_production_reports and the materialize_production command)
+    queryset = ProductionReport.objects.all().order_by('date')
+    serializer_class = ProductionReportSerializer
+
+    @action(detail=False, methods=['get'], url_path='range')
+    def date_range(self, request):
+        # Daily rows between ?from= and ?to=, rolled up on the server with ?period=week|month
+        days, error = parse_range(request.query_params)
+        if error:
+            return error
+        period, error = parse_period(request.query_params)
+        if error:
+            return error
+        return Response(ProductionPeriodSerializer(production_rollup(*days, period), many=True).data)
+
+
+@api_view(['GET'])
+def report_summary(request):
+    # Sales and production side by side for the dashboard; ?from=/?to= default to the last 30 days
+    days, error = parse_range(request.query_params, required=False)
+    if error:
+        return error
+    period, error = parse_period(request.query_params)
+    if error:
+        return error
+    return Response({
+        'from': days[0],
+        'to': days[1],
+        'period': period,
+        'sales': SalesPeriodSerializer(sales_rollup(*days, period), many=True).data,
+        'production': ProductionPeriodSerializer(production_rollup(*days, period), many=True).data,
+    })
@@ -2,6 +2,9 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import api from '../../utils/api';
 
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_POLL_LIMIT = 300; // Five minutes
+
 export const fetchPayrollData = createAsyncThunk(
   'payroll/fetchPayrollData',
   async (_, { rejectWithValue }) => {
@@ -30,8 +33,15 @@ export const generateMonthlyPayroll = createAsyncThunk(
   'payroll/generateMonthlyPayroll',
   async (_, { rejectWithValue }) => {
     try {
-      const response = await api.post('/api/payroll/generate_monthly_payroll/');
-      return response.data;
+      // Payroll is generated by a background worker; poll the job until it finishes or we give up
+      const { data: accepted } = await api.post('/api/payroll/generate_monthly_payroll/');
+      for (let attempt = 0; attempt < JOB_POLL_LIMIT; attempt += 1) {
+        const { data: job } = await api.get(`/api/jobs/${accepted.job_id}/`);
+        if (job.status === 'DONE') return job.result;
+        if (job.status === 'FAILED') return rejectWithValue({ error: job.error });
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      }
+      return rejectWithValue({ error: 'Payroll generation is still running. Check back in a few minutes.' });
     } catch (error) {
       return rejectWithValue(error.response.data);
     }